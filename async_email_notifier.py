@@ -8,7 +8,8 @@ from aiosmtplib import SMTP
 from datetime import datetime
 import os
 from psycopg2 import Error
-from db_utils import get_connection, has_internet
+from db_utils import has_internet
+from student_directory import directory
 
 
 SMTP_CONFIG = {
@@ -162,22 +163,12 @@ async def notify_parent(student_no: str, notification_type: str = "entry"):
         return
 
     try:
-        conn, _ = get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT fullname, guardian_email
-            FROM students
-            WHERE student_no = %s
-        """, (student_no,))
-        result = cur.fetchone()
-        cur.close()
-        conn.close()
-
-        if not result:
+        student = directory.get(student_no)
+        if not student:
             print(f"[WARNING] Not found {student_no}")
             return
 
-        student_name, guardian_email = result
+        student_name, guardian_email = student["fullname"], student["guardian_email"]
         if not guardian_email:
             print(f"[WARNING] No email {student_name}")
             return
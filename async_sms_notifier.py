@@ -2,7 +2,7 @@ import os
 import asyncio
 import threading
 from twilio.rest import Client
-from db_utils import get_connection
+from student_directory import directory
 from dotenv import load_dotenv
 from datetime import datetime
 
@@ -42,22 +42,12 @@ async def send_sms(guardian_number: str, student_name: str, action: str):
 
 async def notify_parent_sms(student_no: str, action: str = "entered"):
     try:
-        conn, _ = get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT fullname, guardian_contact
-            FROM students
-            WHERE student_no = %s
-        """, (student_no,))
-        result = cur.fetchone()
-        cur.close()
-        conn.close()
-
-        if not result:
+        student = directory.get(student_no)
+        if not student:
             print(f"[WARNING] Not Found {student_no}")
             return
 
-        student_name, guardian_phone = result
+        student_name, guardian_phone = student["fullname"], student["guardian_contact"]
         if not guardian_phone:
             print(f"[WARNING] No Contact {student_name}")
             return
@@ -69,8 +59,6 @@ async def notify_parent_sms(student_no: str, action: str = "entered"):
 
     except Exception as e:
         print(f"[DB/SMS ERROR] {e}")
-        if conn:
-            conn.close()
 
 
 def notify_parent_sms_task(student_no: str, action: str = "entered"):
@@ -0,0 +1,98 @@
+import os
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from cryptography.fernet import Fernet
+
+
+DECRYPT_WORKERS = max(1, min(8, os.cpu_count() or 1))
+CHUNK_SIZE = 512
+
+
+def to_bytes(blob):
+    if isinstance(blob, memoryview):
+        return blob.tobytes()
+    return blob
+
+
+def _decrypt_chunk(blobs, cipher):
+    out = []
+    for blob in blobs:
+        try:
+            out.append(cipher.decrypt(blob) if blob else None)
+        except Exception:
+            out.append(None)
+    return out
+
+
+def _chunks(items, size):
+    return [(start, items[start:start + size]) for start in range(0, len(items), size)]
+
+
+def decrypt_rows(key, blobs, workers=DECRYPT_WORKERS, chunk=CHUNK_SIZE):
+    blobs = [to_bytes(b) for b in blobs]
+    if len(blobs) <= chunk or workers <= 1:
+        return _decrypt_chunk(blobs, Fernet(key))
+
+    chunks = [part for _, part in _chunks(blobs, chunk)]
+    cipher = Fernet(key)
+    with ThreadPoolExecutor(workers) as pool:
+        results = pool.map(lambda part: _decrypt_chunk(part, cipher), chunks)
+        return [item for part in results for item in part]
+
+
+def decrypt_embeddings(key, blobs, dim, workers=DECRYPT_WORKERS, chunk=CHUNK_SIZE, progress=None):
+    blobs = [to_bytes(b) for b in blobs]
+    total = len(blobs)
+    matrix = np.empty((total, dim), dtype=np.float32)
+    valid = np.zeros(total, dtype=bool)
+    done = 0
+
+    def store(start, plain):
+        for i, data in enumerate(plain):
+            if data is not None and len(data) == dim * 4:
+                matrix[start + i] = np.frombuffer(data, dtype=np.float32)
+                valid[start + i] = True
+
+    def report(count):
+        nonlocal done
+        done += count
+        if progress:
+            progress(done, total)
+
+    cipher = Fernet(key)
+
+    def work(item):
+        start, part = item
+        store(start, _decrypt_chunk(part, cipher))
+        return len(part)
+
+    with ThreadPoolExecutor(max(1, workers)) as pool:
+        for count in pool.map(work, _chunks(blobs, chunk)):
+            report(count)
+
+    return matrix, valid
+
+
+def benchmark(sizes=(10000, 50000), dim=256, workers=DECRYPT_WORKERS):
+    key = Fernet.generate_key()
+    cipher = Fernet(key)
+    payload = np.random.default_rng(0).random(dim, dtype=np.float32).tobytes()
+
+    for n in sizes:
+        blobs = [cipher.encrypt(payload) for _ in range(n)]
+
+        start = time.perf_counter()
+        for blob in blobs:
+            np.frombuffer(cipher.decrypt(blob), dtype=np.float32)
+        serial = time.perf_counter() - start
+        print(f"{n:>6} rows  serial           {serial:6.2f} s")
+
+        start = time.perf_counter()
+        decrypt_embeddings(key, blobs, dim, workers=workers)
+        elapsed = time.perf_counter() - start
+        print(f"{n:>6} rows  thread  x{workers:<2}     {elapsed:6.2f} s  ({serial / elapsed:.1f}x)")
+
+
+if __name__ == "__main__":
+    benchmark()
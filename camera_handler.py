@@ -1,8 +1,12 @@
 import cv2
+from time import monotonic
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QImage, QPixmap
 from camera_thread import CameraThread
-from face_thread import FaceThread
+from face_thread import FaceWorker
+
+
+FACE_WORKER_RETRY = 5.0
 
 
 class CameraHandler:
@@ -11,17 +15,25 @@ class CameraHandler:
         self.camera_thread = None
         self._display_bgr = None
         self._display_info = None
+        self.face_worker = None
+        self._face_worker_retry = 0.0
+        self._frame_buf = None
+        self._last_seq = -1
 
 
     def start_camera(self):
         if self.camera_thread and self.camera_thread.isRunning():
             return
         self.camera_thread = CameraThread(camera_index=0)
-        self.camera_thread.frameCaptured.connect(self.update_camera_frame)
+        self.camera_thread.frameReady.connect(self.update_camera_frame)
+        self._last_seq = -1
         self.camera_thread.start()
 
 
     def stop_camera(self):
+        if self.face_worker:
+            self.face_worker.stop()
+            self.face_worker = None
         if self.camera_thread and self.camera_thread.isRunning():
             self.camera_thread.stop()
             self.camera_thread.wait()
@@ -29,11 +41,20 @@ class CameraHandler:
         self.clear_camera_feed()
 
 
-    def update_camera_frame(self, frame):
+    def update_camera_frame(self, seq):
+        camera = self.camera_thread
+        if camera is None:
+            return
+        camera.ack_frame()
         if self.main._suppress_feed:
             return
 
-        self.main.original_frame = frame
+        latest = camera.ring.read_latest(self._last_seq, out=self._frame_buf)
+        if latest is None:
+            return
+        self._last_seq, _, frame = latest
+        self._frame_buf = frame
+
         h, w, _ = frame.shape
         crop_size = min(h, w)
         x_start = (w - crop_size) // 2
@@ -56,10 +77,30 @@ class CameraHandler:
 
         self.update_pixmap(display_bgr)
 
-        if self.main.current_qr and self.main.gallery and (not hasattr(self.main, 'face_thread') or not self.main.face_thread.isRunning()):
-            self.main.face_thread = FaceThread(self.main.current_qr, self.main.original_frame, self.main.gallery)
-            self.main.face_thread.result_ready.connect(self.main.on_face_result)
-            self.main.face_thread.start()
+        if self.main.current_qr and self.main.gallery:
+            worker = self.get_face_worker()
+            if worker:
+                worker.set_target(self.main.current_qr, self.main.gallery)
+        elif self.face_worker:
+            self.face_worker.clear_target()
+
+
+    def get_face_worker(self):
+        if self.face_worker and self.face_worker.isFinished():
+            self.face_worker = None
+            self._face_worker_retry = monotonic() + FACE_WORKER_RETRY
+        if self.face_worker is None and self.camera_thread and monotonic() >= self._face_worker_retry:
+            try:
+                self.face_worker = FaceWorker(
+                    self.camera_thread.ring,
+                    on_small_face=self.camera_thread.boost_resolution
+                )
+                self.face_worker.result_ready.connect(self.main.on_face_result)
+                self.face_worker.start()
+            except Exception as e:
+                print(f"[FACE WORKER ERROR] {e}")
+                return None
+        return self.face_worker
 
 
     def update_pixmap(self, bgr_frame):
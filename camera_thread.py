@@ -1,29 +1,111 @@
 import cv2, numpy as np
+import threading
+from time import monotonic
 from PyQt6.QtCore import QThread, pyqtSignal
+from capture_profiles import apply_profile, VERIFY_PROFILE, HIGH_RES_PROFILE
+
+
+HIGH_RES_HOLD = 3.0
+
+
+class FrameRing:
+    def __init__(self, slots=3):
+        self.slots = max(2, slots)
+        self._cond = threading.Condition()
+        self._buffers = [None] * self.slots
+        self._stamps = [0.0] * self.slots
+        self._latest = -1
+        self._read_seq = -1
+        self._closed = False
+        self.seq = -1
+        self.dropped = 0
+
+
+    def write_buffer(self):
+        return self._buffers[(self._latest + 1) % self.slots]
+
+
+    def publish(self, frame):
+        with self._cond:
+            slot = (self._latest + 1) % self.slots
+            self._buffers[slot] = frame
+            self._stamps[slot] = monotonic()
+            if self.seq > self._read_seq:
+                self.dropped += 1
+            self.seq += 1
+            self._latest = slot
+            self._cond.notify_all()
+            return self.seq
+
+
+    def read_latest(self, after_seq=-1, out=None, timeout=None):
+        with self._cond:
+            if timeout is not None:
+                self._cond.wait_for(lambda: self.seq > after_seq or self._closed, timeout)
+            if self.seq <= after_seq or self._latest < 0:
+                return None
+
+            src = self._buffers[self._latest]
+            if out is None or out.shape != src.shape or out.dtype != src.dtype:
+                out = np.empty_like(src)
+            np.copyto(out, src)
+            self._read_seq = self.seq
+            return self.seq, self._stamps[self._latest], out
+
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
 
 
 class CameraThread(QThread):
-    frameCaptured = pyqtSignal(np.ndarray)
-    def __init__(self, camera_index=0, parent=None):
+    frameReady = pyqtSignal(int)
+    def __init__(self, camera_index=0, profile=VERIFY_PROFILE, parent=None):
         super().__init__(parent)
         self.camera_index = camera_index
+        self.base_profile = profile
+        self.profile = None
+        self._requested_profile = profile
+        self._boost_until = 0.0
         self._stop_thread = False
+        self._gui_pending = False
+        self.ring = FrameRing()
 
 
     def run(self):
         cap = cv2.VideoCapture(self.camera_index, cv2.CAP_DSHOW)
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 3840)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 2160)
-        cap.set(cv2.CAP_PROP_FPS, 30)
-        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
 
         while not self._stop_thread:
-            ret, frame = cap.read()
-            if ret:
-                self.frameCaptured.emit(frame)
-            self.msleep(10)
+            if self._boost_until and monotonic() > self._boost_until:
+                self._boost_until = 0.0
+                self._requested_profile = self.base_profile
+            if self._requested_profile != self.profile:
+                self.profile = self._requested_profile
+                apply_profile(cap, self.profile)
+
+            buf = self.ring.write_buffer()
+            ret, frame = cap.read(buf) if buf is not None else cap.read()
+            if not ret:
+                self.msleep(10)
+                continue
+
+            seq = self.ring.publish(frame)
+            if not self._gui_pending:
+                self._gui_pending = True
+                self.frameReady.emit(seq)
 
         cap.release()
+        self.ring.close()
+
+
+    def boost_resolution(self):
+        self._boost_until = monotonic() + HIGH_RES_HOLD
+        self._requested_profile = HIGH_RES_PROFILE
+
+
+    def ack_frame(self):
+        self._gui_pending = False
 
 
     def stop(self):
@@ -0,0 +1,51 @@
+import cv2
+from time import perf_counter, process_time
+
+
+CAPTURE_PROFILES = {
+    "verify": (1920, 1080, 30, "MJPG"),
+    "enroll": (1920, 1080, 30, "MJPG"),
+    "high": (3840, 2160, 30, "MJPG"),
+}
+
+VERIFY_PROFILE = "verify"
+ENROLL_PROFILE = "enroll"
+HIGH_RES_PROFILE = "high"
+
+
+def apply_profile(cap, profile):
+    width, height, fps, fourcc = CAPTURE_PROFILES[profile]
+    cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    cap.set(cv2.CAP_PROP_FPS, fps)
+
+
+def measure_decode_cost(camera_index=0, profiles=None, frames=90, warmup=15):
+    results = {}
+    for profile in profiles or CAPTURE_PROFILES:
+        cap = cv2.VideoCapture(camera_index, cv2.CAP_DSHOW)
+        if not cap.isOpened():
+            raise RuntimeError(f"Cannot open {camera_index}")
+        apply_profile(cap, profile)
+
+        for _ in range(warmup):
+            cap.read()
+
+        buf, start, cpu_start = None, perf_counter(), process_time()
+        for _ in range(frames):
+            ret, frame = cap.read(buf) if buf is not None else cap.read()
+            if ret:
+                buf = frame
+        elapsed = perf_counter() - start
+        cpu_ms = (process_time() - cpu_start) / frames * 1000
+        shape = buf.shape[:2] if buf is not None else (0, 0)
+        cap.release()
+
+        results[profile] = (shape, cpu_ms, frames / elapsed)
+        print(f"{profile:<8} {shape[1]}x{shape[0]}  {cpu_ms:6.2f} cpu ms/frame  {frames / elapsed:5.1f} fps")
+    return results
+
+
+if __name__ == "__main__":
+    measure_decode_cost()
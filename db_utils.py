@@ -1,5 +1,12 @@
 import psycopg2, os
 import socket
+import atexit
+import threading
+from time import monotonic
+from datetime import timedelta
+from contextlib import contextmanager
+from psycopg2.pool import PoolError
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_UNKNOWN
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,8 +15,8 @@ LOCAL_DB = {
     "dbname": "citadel_db",
     "user": "postgres",
     "password": "postgres",
-    "host": "127.0.0.1",
-    "port": 5432,
+    "host": os.getenv("LOCAL_DB_HOST", "127.0.0.1"),
+    "port": int(os.getenv("LOCAL_DB_PORT", "5432")),
 }
 
 CLOUD_DB = {
@@ -24,25 +31,266 @@ CLOUD_DB = {
     "sslkey": os.getenv("SSLKEY"),
 }
 
-def has_internet(host="8.8.8.8", port=53, timeout=3):
-    try:
-        socket.setdefaulttimeout(timeout)
-        socket.socket(socket.AF_INET, socket.SOCK_STREAM).connect((host, port))
-        return True
-    except Exception:
-        return False
-    
-def get_connection():
-    if has_internet():
+POOL_MAX_CONN = 4
+POOL_MAX_AGE = 30 * 60
+POOL_PING_IDLE = 60
+POOL_TIMEOUT = 10
+
+CONNECTIVITY_INTERVAL = 5.0
+CONNECTIVITY_TIMEOUT = 2.0
+CONNECTIVITY_UP_AFTER = 2
+CONNECTIVITY_DOWN_AFTER = 2
+INTERNET_HOST = "8.8.8.8"
+INTERNET_PORT = 53
+
+REFRESH_OVERLAP = timedelta(minutes=2)
+
+
+class ConnectivityMonitor:
+    def __init__(self, name, host, port, interval=CONNECTIVITY_INTERVAL, timeout=CONNECTIVITY_TIMEOUT,
+                 up_after=CONNECTIVITY_UP_AFTER, down_after=CONNECTIVITY_DOWN_AFTER):
+        self.name = name
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.timeout = timeout
+        self.up_after = up_after
+        self.down_after = down_after
+        self._lock = threading.Lock()
+        self._online = None
+        self._streak = 0
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+
+    def probe(self):
+        try:
+            with socket.create_connection((self.host, self.port), timeout=self.timeout):
+                return True
+        except (OSError, TypeError):
+            return False
+
+
+    def report(self, ok):
+        with self._lock:
+            if self._online is None:
+                self._online = ok
+                self._ready.set()
+                print(f"[NET] {self.name} {'reachable' if ok else 'unreachable'}")
+                return
+            if ok == self._online:
+                self._streak = 0
+                return
+            self._streak += 1
+            if self._streak >= (self.up_after if ok else self.down_after):
+                self._online = ok
+                self._streak = 0
+                print(f"[NET] {self.name} {'reachable' if ok else 'unreachable'}")
+
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.report(self.probe())
+            self._stop.wait(self.interval)
+
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"ConnectivityMonitor {self.name}", daemon=True)
+                self._thread.start()
+
+
+    def stop(self):
+        self._stop.set()
+
+
+    def is_online(self):
+        self.start()
+        self._ready.wait(self.timeout)
+        return bool(self._online)
+
+
+monitor = ConnectivityMonitor("Cloud DB", CLOUD_DB["host"], CLOUD_DB["port"])
+internet = ConnectivityMonitor("Internet", INTERNET_HOST, INTERNET_PORT)
+
+
+def cloud_db_reachable():
+    return monitor.is_online()
+
+
+def has_internet():
+    return internet.is_online()
+
+
+class ConnectionPool:
+    def __init__(self, params, maxconn=POOL_MAX_CONN, max_age=POOL_MAX_AGE, ping_idle=POOL_PING_IDLE):
+        self.params = params
+        self.max_age = max_age
+        self.ping_idle = ping_idle
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._idle = []
+        self._born = {}
+
+
+    def _connect(self):
+        conn = psycopg2.connect(**self.params)
+        self._born[id(conn)] = monotonic()
+        return conn
+
+
+    def _discard(self, conn):
+        self._born.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+    def _healthy(self, conn, idle_since):
+        now = monotonic()
+        if conn.closed or now - self._born.get(id(conn), 0.0) > self.max_age:
+            return False
+        if now - idle_since < self.ping_idle:
+            return True
         try:
-            conn = psycopg2.connect(**CLOUD_DB)
-            return conn, "cloud"
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+
+    def getconn(self, timeout=POOL_TIMEOUT):
+        if not self._slots.acquire(timeout=timeout):
+            raise PoolError("Connection pool exhausted")
+        try:
+            while True:
+                with self._lock:
+                    if not self._idle:
+                        break
+                    conn, idle_since = self._idle.pop()
+                if self._healthy(conn, idle_since):
+                    return conn
+                self._discard(conn)
+            return self._connect()
+        except Exception:
+            self._slots.release()
+            raise
+
+
+    def putconn(self, conn, discard=False):
+        try:
+            if not discard and not conn.closed:
+                status = conn.info.transaction_status
+                if status == TRANSACTION_STATUS_UNKNOWN:
+                    discard = True
+                elif status != TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+        except Exception:
+            discard = True
+
+        if discard or conn.closed:
+            self._discard(conn)
+        else:
+            with self._lock:
+                self._idle.append((conn, monotonic()))
+        self._slots.release()
+
+
+    def closeall(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._discard(conn)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(source):
+    with _pools_lock:
+        pool = _pools.get(source)
+        if pool is None:
+            pool = _pools[source] = ConnectionPool(CLOUD_DB if source == "cloud" else LOCAL_DB)
+        return pool
+
+
+def _checkout(source=None):
+    if source:
+        pool = get_pool(source)
+        return pool, pool.getconn(), source
+
+    if cloud_db_reachable():
+        try:
+            pool = get_pool("cloud")
+            return pool, pool.getconn(), "cloud"
         except psycopg2.OperationalError as e:
+            monitor.report(False)
             print("[DB] Cloud connection failed. Details:", e)
         except Exception as e:
             print("[DB] DB error:", e)
     else:
-        print("[DB] No Internet")
+        print("[DB] Cloud DB unreachable")
+    pool = get_pool("local")
+    return pool, pool.getconn(), "local"
+
+
+@contextmanager
+def db_connection(source=None):
+    pool, conn, source = _checkout(source)
+    discard = False
+    try:
+        yield conn, source
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        discard = True
+        raise
+    finally:
+        pool.putconn(conn, discard)
+
+
+def fetch_rows(query, params=()):
+    with db_connection() as (conn, _):
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            return cur.fetchall()
+
+
+def newest(version, updated_at):
+    if updated_at is None:
+        return version
+    return updated_at if version is None or updated_at > version else version
+
+
+def close_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.closeall()
+
+
+atexit.register(monitor.stop)
+atexit.register(internet.stop)
+atexit.register(close_pools)
+
+
+"""Delta refresh migration, once per table ({table} = students, fingerprints):
+
+ALTER TABLE {table} ADD COLUMN updated_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp();
+CREATE INDEX {table}_updated_at_idx ON {table} (updated_at);
+
+CREATE OR REPLACE FUNCTION {table}_touch_updated_at() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at := clock_timestamp();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
 
-    conn = psycopg2.connect(**LOCAL_DB)
-    return conn, "local"
+CREATE TRIGGER {table}_touch_updated_at
+BEFORE UPDATE ON {table}
+FOR EACH ROW EXECUTE FUNCTION {table}_touch_updated_at();"""
@@ -4,7 +4,8 @@ import psycopg2
 from face_enroll_worker import FaceEnrollWorker
 from finger_enroll_thread import FingerEnrollWorker
 from marquee_label import FooterMarquee
-from db_utils import get_connection
+from db_utils import db_connection
+from student_directory import directory
 
 
 class EnrollPage:
@@ -162,7 +163,7 @@ class EnrollPage:
 
         elif self.selected_mode == "finger":
             if hasattr(wnd, "fingerprint_thread"):
-                wnd.fingerprint_thread.deactivate()
+                wnd.fingerprint_thread.release_device()
             self.set_status("Starting Fingerprint Enrollment", "#FFBF66")
             self.worker = FingerEnrollWorker(student_no)
             self.worker.finished.connect(self.on_enroll_done)
@@ -188,34 +189,23 @@ class EnrollPage:
 
 
     def student_exists(self, student_no):
-        conn, _ = get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT 1 FROM students WHERE student_no = %s", (student_no,))
-        found = cur.fetchone() is not None
-        cur.close()
-        conn.close()
+        found = directory.get(student_no) is not None
         print(f"{'FOUND' if found else 'NOT FOUND'}")
         return found
 
 
     def is_already_enrolled(self, student_no, mode):
-        from db_utils import get_connection
-
-        conn, _ = get_connection()
-        cur = conn.cursor()
-
-        if mode == "face":
-            cur.execute("SELECT has_facial_recognition FROM students WHERE student_no = %s", (student_no,))
-            result = cur.fetchone()
-            exists = bool(result and result[0])
-        elif mode == "finger":
-            cur.execute("SELECT 1 FROM fingerprints WHERE student_no = %s", (student_no,))
-            exists = cur.fetchone() is not None
-        else:
-            exists = False
-
-        cur.close()
-        conn.close()
+        with db_connection() as (conn, _):
+            with conn.cursor() as cur:
+                if mode == "face":
+                    cur.execute("SELECT has_facial_recognition FROM students WHERE student_no = %s", (student_no,))
+                    result = cur.fetchone()
+                    exists = bool(result and result[0])
+                elif mode == "finger":
+                    cur.execute("SELECT 1 FROM fingerprints WHERE student_no = %s", (student_no,))
+                    exists = cur.fetchone() is not None
+                else:
+                    exists = False
 
         print(f"{'ENROLLED' if exists else 'NOT ENROLLED'}")
         return exists
@@ -235,12 +225,9 @@ class EnrollPage:
 
         wnd = self.page.window()
 
-        if success and hasattr(wnd, "verification_handler"):
+        if success and hasattr(wnd, "start_gallery_load"):
             try:
-                from face_recognition import load_gallery, reset_models
-                reset_models()
-                new_gallery = load_gallery(force_reload=True)
-                wnd.verification_handler.gallery = new_gallery
+                wnd.start_gallery_load(force_reload=True)
             except Exception as e:
                 print(f"Failed {e}")
 
@@ -248,13 +235,6 @@ class EnrollPage:
         def reset_reader():
             if not hasattr(wnd, "fingerprint_thread"):
                 return
-            with wnd.fingerprint_thread._lock:
-                if wnd.fingerprint_thread.reader:
-                    try:
-                        wnd.fingerprint_thread.reader.close()
-                    except Exception:
-                        pass
-                wnd.fingerprint_thread.reader = None
             wnd.fingerprint_thread.activate()
 
         QTimer.singleShot(100, reset_reader)
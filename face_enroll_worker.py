@@ -3,6 +3,8 @@ import cv2
 import numpy as np
 from time import time
 from face_enrollment import extract_embedding, save_to_db, open_camera, get_face, STILL_DURATION
+from face_models import registry
+from face_recognition import add_to_gallery
 
 class FaceEnrollWorker(QThread):
     finished = pyqtSignal(bool, str)
@@ -16,6 +18,8 @@ class FaceEnrollWorker(QThread):
         self.cap = None
 
     def run(self):
+        registry.acquire()
+        face_crop = None
         try:
             self.cap = open_camera()
             last_box, face_box = None, None
@@ -40,12 +44,9 @@ class FaceEnrollWorker(QThread):
                 now = time()
 
                 if frame_count % DETECT_INTERVAL == 0 or face_box is None:
-                    small = cv2.resize(frame, (1280, 720))
-                    detected = get_face(small)
+                    detected = get_face(frame)
                     if detected:
-                        sx, sy = frame.shape[1] / 1280, frame.shape[0] / 720
-                        face_box = [int(detected[0] * sx), int(detected[1] * sy),
-                                    int(detected[2] * sx), int(detected[3] * sy)]
+                        face_box = list(detected)
                         last_detect_time = now
                     elif now - last_detect_time > 0.5:
                         face_box = None
@@ -89,11 +90,13 @@ class FaceEnrollWorker(QThread):
                 try:
                     emb = extract_embedding(face_crop)
                     save_to_db(self.student_no, emb)
+                    add_to_gallery(self.student_no, emb)
                     self.finished.emit(True, "Success")
                 except Exception as e:
                     self.finished.emit(False, f"Error {e}")
             elif self._running:
                 self.finished.emit(False, "Enrollment Cancelled")
+            registry.release()
 
     def stop(self):
         self._running = False
@@ -0,0 +1,207 @@
+import threading
+import numpy as np
+from face_index import ExactIndex
+
+
+class FaceGallery:
+    def __init__(self, ids=None, matrix=None):
+        ids = np.asarray(ids if ids is not None else [], dtype=object)
+        if matrix is None:
+            matrix = np.empty((0, 0), dtype=np.float32)
+        self._lock = threading.RLock()
+        self._id_storage = ids
+        self._storage = np.ascontiguousarray(matrix, dtype=np.float32)
+        self._size = len(ids)
+        self._rows = {sid: row for row, sid in enumerate(ids)}
+        self._neighbours = {}
+        self.index = ExactIndex(self.matrix)
+
+
+    @classmethod
+    def from_embeddings(cls, items):
+        ids, vectors = [], []
+        for sid, emb in items:
+            ids.append(sid)
+            vectors.append(np.asarray(emb, dtype=np.float32).ravel())
+
+        if not vectors:
+            return cls()
+
+        matrix = np.vstack(vectors)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-9
+        return cls(ids, matrix)
+
+
+    @classmethod
+    def from_matrix(cls, ids, matrix):
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        if len(matrix):
+            matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-9
+        return cls(ids, matrix)
+
+
+    @property
+    def matrix(self):
+        return self._storage[:self._size]
+
+
+    @property
+    def ids(self):
+        return self._id_storage[:self._size]
+
+
+    def __len__(self):
+        return len(self._rows)
+
+
+    def __contains__(self, sid):
+        return sid in self._rows
+
+
+    @property
+    def dim(self):
+        return self._storage.shape[1] if self._storage.ndim == 2 else 0
+
+
+    def row_of(self, sid):
+        return self._rows.get(sid)
+
+
+    def embedding(self, sid):
+        with self._lock:
+            row = self._rows.get(sid)
+            return None if row is None else self.matrix[row].copy()
+
+
+    def scores(self, emb):
+        with self._lock:
+            return self.matrix @ np.asarray(emb, dtype=np.float32)
+
+
+    def search(self, emb, k=1):
+        with self._lock:
+            sims, rows = self.index.search(np.asarray(emb, dtype=np.float32), k)
+            live = np.isfinite(sims)
+            return sims[live], self.ids[rows[live]]
+
+
+    def _grow(self, dim):
+        capacity = max(16, 2 * self._storage.shape[0])
+        storage = np.empty((capacity, dim), dtype=np.float32)
+        id_storage = np.empty(capacity, dtype=object)
+        if self._size:
+            storage[:self._size] = self.matrix
+            id_storage[:self._size] = self.ids
+        self._storage, self._id_storage = storage, id_storage
+
+
+    def upsert(self, sid, emb):
+        emb = np.asarray(emb, dtype=np.float32).ravel()
+        emb = emb / (np.linalg.norm(emb) + 1e-9)
+
+        with self._lock:
+            if not self._storage.flags.writeable:
+                self._storage = self._storage.copy()
+            row = self._rows.get(sid)
+            if row is not None:
+                self._storage[row] = emb
+                self.index.replace(self.matrix, row)
+            else:
+                if self._size and self.dim != emb.size:
+                    raise ValueError(f"Embedding size {emb.size} != gallery size {self.dim}")
+                if self._size >= self._storage.shape[0]:
+                    self._grow(emb.size)
+                row = self._size
+                self._storage[row] = emb
+                self._id_storage[row] = sid
+                self._rows[sid] = row
+                self._size += 1
+                self.index.add(self.matrix, row)
+            self._invalidate_neighbours(row)
+
+
+    def remove(self, sid):
+        with self._lock:
+            row = self._rows.pop(sid, None)
+            if row is None:
+                return
+            if not self._storage.flags.writeable:
+                self._storage = self._storage.copy()
+            self._storage[row] = 0.0
+            self._id_storage[row] = None
+            self.index.remove(row)
+            self._invalidate_neighbours(row)
+
+
+    def live(self):
+        with self._lock:
+            rows = np.fromiter(self._rows.values(), dtype=np.int64, count=len(self._rows))
+            rows.sort()
+            return self.ids[rows].copy(), self.matrix[rows].copy()
+
+
+    def _invalidate_neighbours(self, row):
+        if not self._neighbours:
+            return
+        self._neighbours.pop(row, None)
+        sims = self.matrix @ self.matrix[row]
+        for other, top in list(self._neighbours.items()):
+            if row in top or sims[other] > self.matrix[other] @ self.matrix[top[-1]]:
+                del self._neighbours[other]
+
+
+    def _top_rows(self, sims, k):
+        n = sims.shape[-1]
+        top = np.argpartition(sims, n - k, axis=-1)[..., n - k:]
+        order = np.argsort(np.take_along_axis(sims, top, axis=-1), axis=-1)[..., ::-1]
+        return np.take_along_axis(top, order, axis=-1).astype(np.int32)
+
+
+    def build_neighbours(self, k, chunk=1024):
+        with self._lock:
+            matrix = self.matrix
+            n = len(matrix)
+            k = min(k, n - 1)
+            self._neighbours = {}
+            if k <= 0:
+                return
+
+            for start in range(0, n, chunk):
+                block = matrix[start:start + chunk] @ matrix.T
+                rows = np.arange(block.shape[0])
+                block[rows, rows + start] = -np.inf
+                for i, top in enumerate(self._top_rows(block, k)):
+                    self._neighbours[start + i] = top
+
+
+    def neighbours(self, sid, k):
+        with self._lock:
+            row = self._rows.get(sid)
+            k = min(k, self._size - 1)
+            if row is None or k <= 0:
+                return np.empty(0, dtype=np.int32)
+
+            cached = self._neighbours.get(row)
+            if cached is None or len(cached) < k:
+                sims = self.matrix @ self.matrix[row]
+                sims[row] = -np.inf
+                cached = self._top_rows(sims, k)
+                self._neighbours[row] = cached
+            return cached[:k]
+
+
+    def verify_claim(self, sid, emb, k):
+        with self._lock:
+            row = self._rows.get(sid)
+            if row is None:
+                return None, None, None
+
+            emb = np.asarray(emb, dtype=np.float32)
+            claimed = float(self.matrix[row] @ emb)
+            cohort = self.neighbours(sid, k)
+            if cohort.size == 0:
+                return claimed, None, None
+
+            cohort_sims = self.matrix[cohort] @ emb
+            best = int(np.argmax(cohort_sims))
+            return claimed, float(cohort_sims[best]), self.ids[cohort[best]]
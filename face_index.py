@@ -0,0 +1,205 @@
+import time
+import hashlib
+import numpy as np
+
+
+ANN_MIN_SIZE = 20000
+IVF_NPROBE = 16
+IVF_TRAIN_ITERS = 10
+
+
+def _top_k(sims, k):
+    n = sims.shape[0]
+    k = max(1, min(k, n))
+    top = np.argpartition(sims, n - k)[n - k:] if k < n else np.arange(n)
+    return top[np.argsort(sims[top])[::-1]]
+
+
+class ExactIndex:
+    kind = "exact"
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+        self._dead = np.empty(0, dtype=np.int64)
+
+
+    def search(self, emb, k=1):
+        if self.matrix.shape[0] == 0:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+        sims = self.matrix @ emb
+        if self._dead.size:
+            sims[self._dead] = -np.inf
+        top = _top_k(sims, k)
+        return sims[top], top
+
+
+    def add(self, matrix, row):
+        self.matrix = matrix
+
+
+    def replace(self, matrix, row):
+        self.matrix = matrix
+
+
+    def remove(self, row):
+        self._dead = np.append(self._dead, row)
+
+
+    def state(self):
+        return {}
+
+
+class IVFIndex:
+    kind = "ivf"
+
+    def __init__(self, matrix, centroids, order, offsets, nprobe=IVF_NPROBE):
+        self.matrix = matrix
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.order = np.asarray(order, dtype=np.int64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.nprobe = nprobe
+        self._vectors = np.ascontiguousarray(matrix[self.order])
+        self._positions = None
+        self._dead = np.zeros(len(self.order), dtype=bool)
+        self._extra = np.empty(0, dtype=np.int64)
+
+
+    @classmethod
+    def build(cls, matrix, nlist=None, nprobe=IVF_NPROBE, iters=IVF_TRAIN_ITERS, seed=0):
+        n = matrix.shape[0]
+        nlist = nlist or max(1, int(np.sqrt(n)))
+        nlist = min(nlist, n)
+        rng = np.random.default_rng(seed)
+
+        sample = matrix[rng.choice(n, size=min(n, nlist * 64), replace=False)]
+        centroids = sample[rng.choice(sample.shape[0], size=nlist, replace=False)].copy()
+        for _ in range(iters):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[assign == c]
+                if members.size:
+                    centroids[c] = members.mean(axis=0)
+            centroids /= np.linalg.norm(centroids, axis=1, keepdims=True) + 1e-9
+
+        assign = np.empty(n, dtype=np.int64)
+        for start in range(0, n, 4096):
+            assign[start:start + 4096] = np.argmax(matrix[start:start + 4096] @ centroids.T, axis=1)
+
+        order = np.argsort(assign, kind="stable")
+        offsets = np.searchsorted(assign[order], np.arange(nlist + 1))
+        return cls(matrix, centroids, order, offsets, nprobe)
+
+
+    def search(self, emb, k=1):
+        nlist = self.centroids.shape[0]
+        probe = _top_k(self.centroids @ emb, min(self.nprobe, nlist))
+
+        slices = [(self.offsets[c], self.offsets[c + 1]) for c in probe]
+        sims = np.concatenate([self._vectors[a:b] @ emb for a, b in slices] + [self.matrix[self._extra] @ emb])
+        rows = np.concatenate([self.order[a:b] for a, b in slices] + [self._extra])
+        dead = np.concatenate([self._dead[a:b] for a, b in slices] + [np.zeros(self._extra.size, dtype=bool)])
+        sims, rows = sims[~dead], rows[~dead]
+        if rows.size == 0:
+            return np.empty(0, dtype=np.float32), rows
+
+        top = _top_k(sims, k)
+        return sims[top], rows[top]
+
+
+    def _tombstone(self, row):
+        if self._positions is None:
+            self._positions = np.empty(len(self.order), dtype=np.int64)
+            self._positions[self.order] = np.arange(len(self.order))
+        if row < len(self._positions):
+            self._dead[self._positions[row]] = True
+        self._extra = self._extra[self._extra != row]
+
+
+    def add(self, matrix, row):
+        self.matrix = matrix
+        self._extra = np.append(self._extra, row)
+
+
+    def replace(self, matrix, row):
+        self.matrix = matrix
+        self._tombstone(row)
+        self._extra = np.append(self._extra, row)
+
+
+    def remove(self, row):
+        self._tombstone(row)
+
+
+    def state(self):
+        return {
+            "centroids": self.centroids,
+            "order": self.order,
+            "offsets": self.offsets,
+            "nprobe": np.int64(self.nprobe),
+        }
+
+
+def index_kind(size, kind="auto"):
+    if kind == "auto":
+        kind = "ivf" if size >= ANN_MIN_SIZE else "exact"
+    return kind if kind == "ivf" and size > 0 else "exact"
+
+
+def build_index(matrix, kind="auto"):
+    if index_kind(matrix.shape[0], kind) == "ivf":
+        return IVFIndex.build(matrix)
+    return ExactIndex(matrix)
+
+
+def _checksum(matrix, ids):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.ascontiguousarray(matrix, dtype=np.float32).tobytes())
+    digest.update("\0".join(str(sid) for sid in ids).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def save_index(index, path, ids):
+    np.savez(path, kind=index.kind, checksum=_checksum(index.matrix, ids), **index.state())
+
+
+def load_index(path, matrix, ids):
+    with np.load(path, allow_pickle=False) as data:
+        if "checksum" not in data or str(data["checksum"]) != _checksum(matrix, ids):
+            raise ValueError("Index does not match gallery")
+        if str(data["kind"]) == "ivf":
+            return IVFIndex(matrix, data["centroids"], data["order"], data["offsets"], int(data["nprobe"]))
+    return ExactIndex(matrix)
+
+
+def benchmark(n=50000, dim=256, queries=200, k=5, nprobes=(1, 4, 8, 16, 32), seed=0):
+    rng = np.random.default_rng(seed)
+    clusters = rng.normal(size=(max(1, n // 50), dim)).astype(np.float32)
+    matrix = clusters[rng.integers(0, clusters.shape[0], n)] + 0.5 * rng.normal(size=(n, dim)).astype(np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+
+    probes = matrix[rng.choice(n, queries, replace=False)] + 0.2 * rng.normal(size=(queries, dim)).astype(np.float32)
+    probes /= np.linalg.norm(probes, axis=1, keepdims=True)
+
+    def run(index):
+        results, start = [], time.perf_counter()
+        for q in probes:
+            results.append(index.search(q, k)[1])
+        return results, (time.perf_counter() - start) / queries * 1000
+
+    exact, exact_ms = run(ExactIndex(matrix))
+    print(f"exact      n={n} dim={dim}  {exact_ms:7.3f} ms/query")
+
+    start = time.perf_counter()
+    ivf = IVFIndex.build(matrix)
+    print(f"ivf build  nlist={ivf.centroids.shape[0]}  {time.perf_counter() - start:7.2f} s")
+
+    for nprobe in nprobes:
+        ivf.nprobe = nprobe
+        approx, ms = run(ivf)
+        recall_1 = np.mean([a[0] == e[0] for a, e in zip(approx, exact)])
+        recall_k = np.mean([len(set(a) & set(e)) / len(e) for a, e in zip(approx, exact)])
+        print(f"ivf        nprobe={nprobe:<3} {ms:7.3f} ms/query  recall@1={recall_1:.3f}  recall@{k}={recall_k:.3f}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,207 @@
+import os
+import json
+import threading
+import numpy as np
+from time import perf_counter, monotonic
+from openvino.runtime import Core, Layout, Type, get_version
+from openvino.preprocess import PrePostProcessor, ColorFormat, ResizeAlgorithm
+
+
+DET_MODEL = "./models/intel/face-detection-adas-0001/FP16/face-detection-adas-0001.xml"
+REC_MODEL = "./models/intel/face-reidentification-retail-0095/FP16/face-reidentification-retail-0095.xml"
+
+MODEL_CACHE_DIR = "./cache/openvino"
+DEVICE_RECORD = os.path.join(MODEL_CACHE_DIR, "device.json")
+DEVICE_ORDER = ("AUTO", "GPU", "CPU")
+BENCHMARK_RUNS = 5
+MODEL_RETRY_INTERVAL = 5 * 60
+
+_core = None
+
+
+def get_core():
+    global _core
+    if _core is None:
+        _core = Core()
+        try:
+            os.makedirs(MODEL_CACHE_DIR, exist_ok=True)
+            _core.set_property({"CACHE_DIR": MODEL_CACHE_DIR})
+        except Exception as e:
+            print(f"[MODEL] Cache disabled: {e}")
+    return _core
+
+
+def read_face_model(core, model_path):
+    model = core.read_model(model_path)
+    ppp = PrePostProcessor(model)
+    inp = ppp.input()
+    inp.tensor() \
+        .set_element_type(Type.u8) \
+        .set_layout(Layout("NHWC")) \
+        .set_color_format(ColorFormat.BGR) \
+        .set_spatial_dynamic_shape()
+    inp.preprocess() \
+        .convert_element_type(Type.f32) \
+        .resize(ResizeAlgorithm.RESIZE_LINEAR)
+    inp.model().set_layout(Layout("NCHW"))
+    return ppp.build()
+
+
+def as_input(img):
+    return np.ascontiguousarray(img)[None]
+
+
+def _candidate_devices(core):
+    forced = os.getenv("OPENVINO_DEVICE")
+    if forced:
+        return [forced]
+    available = {d.split(".")[0] for d in core.available_devices}
+    return [d for d in DEVICE_ORDER if d == "AUTO" or d in available]
+
+
+def _compile_pair(core, device):
+    det = core.compile_model(read_face_model(core, DET_MODEL), device)
+    rec = core.compile_model(read_face_model(core, REC_MODEL), device)
+    return det, rec
+
+
+def _time_inference(det, rec, runs=BENCHMARK_RUNS):
+    frame = as_input(np.zeros((1080, 1920, 3), dtype=np.uint8))
+    crop = as_input(np.zeros((160, 160, 3), dtype=np.uint8))
+    det([frame])
+    rec([crop])
+    start = perf_counter()
+    for _ in range(runs):
+        det([frame])
+        rec([crop])
+    return (perf_counter() - start) / runs * 1000
+
+
+def _read_device_record():
+    try:
+        with open(DEVICE_RECORD) as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return record if record.get("openvino") == get_version() else None
+
+
+def _write_device_record(device, timings):
+    try:
+        with open(DEVICE_RECORD, "w") as f:
+            json.dump({"device": device, "openvino": get_version(), "timings": timings}, f, indent=2)
+    except OSError as e:
+        print(f"[MODEL] Could not record device: {e}")
+
+
+def load_face_models():
+    core = get_core()
+    candidates = _candidate_devices(core)
+
+    record = _read_device_record()
+    if record and record.get("device") in candidates:
+        try:
+            det, rec = _compile_pair(core, record["device"])
+            return det, rec, record["device"]
+        except Exception as e:
+            print(f"[MODEL] {record['device']} failed, re-selecting: {e}")
+
+    best, timings = None, {}
+    for device in candidates:
+        try:
+            start = perf_counter()
+            det, rec = _compile_pair(core, device)
+            compile_s = perf_counter() - start
+            infer_ms = _time_inference(det, rec)
+        except Exception as e:
+            print(f"[MODEL] {device} unavailable: {e}")
+            continue
+
+        timings[device] = {"compile_s": round(compile_s, 3), "infer_ms": round(infer_ms, 3)}
+        print(f"[MODEL] {device}: compile {compile_s:.2f}s, infer {infer_ms:.1f}ms")
+        if best is None or infer_ms < best[3]:
+            best = (det, rec, device, infer_ms)
+
+    if best is None:
+        print("[MODEL] No device could compile the face models")
+        return None, None, None
+
+    _write_device_record(best[2], timings)
+    return best[:3]
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models = None
+        self._refs = 0
+        self._generation = 0
+        self._retry_at = 0.0
+        self._local = threading.local()
+
+
+    def _ensure_loaded(self):
+        failed = self._models is not None and self._models[0] is None
+        if self._models is None or (failed and monotonic() >= self._retry_at):
+            self._models = load_face_models()
+            self._generation += 1
+            if self._models[0] is None:
+                self._retry_at = monotonic() + MODEL_RETRY_INTERVAL
+                print(f"[MODEL] Retrying device selection in {MODEL_RETRY_INTERVAL}s")
+        return self._models
+
+
+    def acquire(self):
+        with self._lock:
+            self._refs += 1
+            return self._ensure_loaded()
+
+
+    def release(self):
+        with self._lock:
+            self._refs = max(0, self._refs - 1)
+            if self._refs == 0:
+                self._generation += 1
+
+
+    def get(self):
+        with self._lock:
+            return self._ensure_loaded()
+
+
+    def infer_request(self, which):
+        with self._lock:
+            det, rec, _ = self._ensure_loaded()
+            generation = self._generation
+
+        if getattr(self._local, "generation", None) != generation:
+            self._local.generation = generation
+            self._local.requests = {}
+
+        model = det if which == "det" else rec
+        if model is None:
+            return None
+        req = self._local.requests.get(which)
+        if req is None:
+            req = self._local.requests[which] = model.create_infer_request()
+        return req
+
+
+    def warm(self):
+        try:
+            self.get()
+        except Exception as e:
+            print(f"[MODEL] Warm-up failed: {e}")
+
+
+    def start_warmup(self):
+        threading.Thread(target=self.warm, name="ModelWarmup", daemon=True).start()
+
+
+    def reload(self):
+        with self._lock:
+            self._models = None
+            return self._ensure_loaded()
+
+
+registry = ModelRegistry()
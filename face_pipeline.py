@@ -0,0 +1,128 @@
+import threading
+from openvino.runtime import AsyncInferQueue
+from PyQt6.QtCore import QObject, pyqtSignal
+from face_models import registry, as_input
+from face_recognition import best_face_box, normalize_embedding, match_embedding
+from capture_profiles import CAPTURE_PROFILES, VERIFY_PROFILE
+
+
+PIPELINE_JOBS = 2
+MIN_FACE_CROP = 160
+MIN_FACE_CROP_WIDTH = CAPTURE_PROFILES[VERIFY_PROFILE][0]
+
+
+class FacePipeline(QObject):
+    result_ready = pyqtSignal(bool, str, tuple)
+
+    def __init__(self, jobs=PIPELINE_JOBS, on_small_face=None, parent=None):
+        super().__init__(parent)
+        self.jobs = jobs
+        self.on_small_face = on_small_face
+        self._det_model, self._rec_model, _ = registry.acquire()
+        if not self._det_model or not self._rec_model:
+            registry.release()
+            raise RuntimeError("Face models not loaded")
+
+        self._det_input = self._det_model.input(0).any_name
+        self._rec_input = self._rec_model.input(0).any_name
+
+        self._det_queue = AsyncInferQueue(self._det_model, jobs)
+        self._rec_queue = AsyncInferQueue(self._rec_model, jobs + 1)
+        self._det_queue.set_callback(self._on_detection)
+        self._rec_queue.set_callback(self._on_embedding)
+
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._in_flight = 0
+        self._next_seq = 0
+        self._last_emitted = -1
+        self._generation = 0
+        self._matched = False
+
+
+    def retarget(self):
+        with self._lock:
+            self._generation += 1
+            self._matched = False
+
+
+    def wait_ready(self, timeout=None):
+        with self._ready:
+            return self._ready.wait_for(lambda: self._in_flight < self.jobs, timeout)
+
+
+    def submit(self, school_id, frame, gallery):
+        with self._lock:
+            if self._in_flight >= self.jobs:
+                return False
+            self._in_flight += 1
+            seq = self._next_seq
+            self._next_seq += 1
+            job = (seq, self._generation)
+
+        try:
+            self._det_queue.start_async({self._det_input: as_input(frame)}, (job, school_id, frame, gallery))
+        except Exception as e:
+            print(f"[PIPELINE ERROR] {e}")
+            self._finish(job, False, "Detection Failed", (0, 0, 0, 0))
+        return True
+
+
+    def wait_all(self):
+        self._det_queue.wait_all()
+        self._rec_queue.wait_all()
+
+
+    def close(self):
+        self.wait_all()
+        registry.release()
+
+
+    def _on_detection(self, request, userdata):
+        job, school_id, frame, gallery = userdata
+        try:
+            box = best_face_box(request.get_output_tensor(0).data, frame.shape)
+            if box is None:
+                self._finish(job, False, "No Face Detected", (0, 0, 0, 0))
+                return
+
+            x1, y1, x2, y2 = box
+            face_crop = frame[y1:y2, x1:x2]
+            if face_crop.size == 0:
+                self._finish(job, False, "Invalid Crop", box)
+                return
+            side = min(x2 - x1, y2 - y1) * MIN_FACE_CROP_WIDTH / frame.shape[1]
+            if self.on_small_face and side < MIN_FACE_CROP:
+                self.on_small_face()
+
+            self._rec_queue.start_async(
+                {self._rec_input: as_input(face_crop)},
+                (job, school_id, gallery, box)
+            )
+        except Exception as e:
+            print(f"[PIPELINE ERROR] {e}")
+            self._finish(job, False, "Detection Failed", (0, 0, 0, 0))
+
+
+    def _on_embedding(self, request, userdata):
+        job, school_id, gallery, box = userdata
+        try:
+            emb = normalize_embedding(request.get_output_tensor(0).data)
+            ok, msg = match_embedding(school_id, emb, gallery)
+        except Exception as e:
+            print(f"[PIPELINE ERROR] {e}")
+            ok, msg = False, "Embedding Failed"
+        self._finish(job, ok, msg, box)
+
+
+    def _finish(self, job, ok, msg, box):
+        seq, generation = job
+        with self._lock:
+            self._in_flight -= 1
+            self._ready.notify_all()
+            stale = seq < self._last_emitted or generation != self._generation or self._matched
+            if not stale:
+                self._last_emitted = seq
+                self._matched = ok
+        if not stale:
+            self.result_ready.emit(ok, msg, tuple(box))
@@ -1,11 +1,18 @@
 import os
-import cv2
+import base64
+import threading
+import psycopg2
 import numpy as np
-from openvino.runtime import Core
-from scipy.spatial.distance import cosine
+from time import monotonic
 from cryptography.fernet import Fernet
 from dotenv import load_dotenv
-from db_utils import get_connection
+from db_utils import fetch_rows, newest, REFRESH_OVERLAP
+from face_gallery import FaceGallery
+from face_index import ExactIndex, index_kind, build_index, save_index, load_index
+from face_models import registry, as_input
+from bulk_decrypt import decrypt_embeddings
+from gallery_snapshot import save_snapshot, load_snapshot
+from student_directory import directory
 
 
 load_dotenv()
@@ -19,144 +26,306 @@ OPENVINO_LIBS = r".\venv\Lib\site-packages\openvino\libs"
 os.environ["PATH"] = OPENVINO_LIBS + os.pathsep + os.environ.get("PATH", "")
 
 
-PROCESS_WIDTH, PROCESS_HEIGHT = 960, 540
+EMBEDDING_DIM = 256
 CONF_THRESHOLD = 0.75
 SIM_THRESHOLD = 0.75
+MATCH_TOP_K = 5
+VERIFY_MODE = os.getenv("FACE_VERIFY_MODE", "1:N")
+IMPOSTOR_TOP_K = 16
+NEIGHBOUR_PRECOMPUTE_MAX = 10000
+INDEX_KIND = os.getenv("FACE_INDEX", "exact")
+INDEX_PATH = "./cache/face_index.npz"
+SNAPSHOT_PATH = "./cache/face_gallery.bin"
+FULL_RELOAD_INTERVAL = 6 * 60 * 60
+PROGRESS_EVERY = 256
 
 
-DET_MODEL = "./models/intel/face-detection-adas-0001/FP16/face-detection-adas-0001.xml"
-REC_MODEL = "./models/intel/face-reidentification-retail-0095/FP16/face-reidentification-retail-0095.xml"
+_gallery_cache = None
+_gallery_version = None
+_last_full_reload = 0.0
+_delta_supported = True
+_unreadable = set()
+_load_lock = threading.Lock()
+
 
+def _decode_blob(blob):
+    if isinstance(blob, memoryview):
+        return blob.tobytes()
+    if isinstance(blob, str):
+        try:
+            return bytes.fromhex(blob)
+        except ValueError:
+            try:
+                return base64.b64decode(blob)
+            except Exception:
+                return blob.encode("utf-8")
+    return blob
 
-_ie = Core()
-def _load_model(model_path, device="GPU"):
+
+def _decrypt_embedding(sid, blob):
+    if not blob:
+        return None
     try:
-        model = _ie.compile_model(_ie.read_model(model_path), device)
-        return model
-    except Exception:
+        embedding = np.frombuffer(fernet.decrypt(_decode_blob(blob)), dtype=np.float32)
+    except Exception as e:
+        print(f"[DECRYPT ERROR] {sid}: {e}")
         return None
+    return embedding if embedding.size > 0 else None
 
-_det_model = _load_model(DET_MODEL)
-_rec_model = _load_model(REC_MODEL)
 
-_det_h, _det_w = _det_model.input(0).shape[2:] if _det_model else (0, 0)
-_rec_h, _rec_w = _rec_model.input(0).shape[2:] if _rec_model else (0, 0)
+def _enrolled_ids():
+    rows = fetch_rows("""
+        SELECT student_no
+        FROM students
+        WHERE has_facial_recognition = TRUE AND facial_recognition_data IS NOT NULL
+    """)
+    return {sid for (sid,) in rows}
 
-_det_req = _det_model.create_infer_request() if _det_model else None
-_gallery_cache = None
+
+def _save_snapshot(gallery):
+    ids, matrix = gallery.live()
+    try:
+        save_snapshot(SNAPSHOT_PATH, FERNET_KEY.encode(), ids, matrix, _gallery_version)
+    except Exception as e:
+        print(f"[SNAPSHOT ERROR] {e}")
+
+
+def load_gallery_snapshot():
+    global _gallery_cache, _gallery_version, _last_full_reload
+    with _load_lock:
+        if _gallery_cache is not None:
+            return _gallery_cache
+        try:
+            ids, matrix, version = load_snapshot(SNAPSHOT_PATH, FERNET_KEY.encode())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"[SNAPSHOT ERROR] {e}")
+            return None
+
+        gallery = FaceGallery(ids, matrix)
+        gallery.index = _gallery_index(gallery)
+        _gallery_cache = gallery
+        _gallery_version = version
+        _last_full_reload = monotonic()
+        return gallery
 
 
-def load_gallery(force_reload=False):
-    global _gallery_cache
+def _full_reload(progress=None):
+    global _gallery_cache, _gallery_version, _last_full_reload, _delta_supported, _unreadable
+    try:
+        try:
+            rows = fetch_rows("""
+                SELECT student_no, facial_recognition_data, updated_at
+                FROM students
+                WHERE has_facial_recognition = TRUE
+            """)
+        except psycopg2.errors.UndefinedColumn:
+            _delta_supported = False
+            rows = [(sid, blob, None) for sid, blob in fetch_rows("""
+                SELECT student_no, facial_recognition_data
+                FROM students
+                WHERE has_facial_recognition = TRUE
+            """)]
+    except Exception as e:
+        print(f"[DB ERROR] {e}")
+        return _gallery_cache if _gallery_cache is not None else FaceGallery()
+
+    unreadable = {sid for sid, blob, _ in rows if not blob}
+    rows = [row for row in rows if row[1]]
+    version = None
+    for _, _, updated_at in rows:
+        version = newest(version, updated_at)
+
+    matrix, valid = decrypt_embeddings(
+        FERNET_KEY.encode(),
+        [_decode_blob(blob) for _, blob, _ in rows],
+        EMBEDDING_DIM,
+        progress=progress
+    )
+    ids = np.array([sid for sid, _, _ in rows], dtype=object)
+    for sid in ids[~valid]:
+        print(f"[DECRYPT ERROR] {sid}")
+        unreadable.add(sid)
+    if not valid.all():
+        ids, matrix = ids[valid], matrix[valid]
+
+    gallery = FaceGallery.from_matrix(ids, matrix)
+    if len(gallery) <= NEIGHBOUR_PRECOMPUTE_MAX:
+        gallery.build_neighbours(IMPOSTOR_TOP_K)
+    gallery.index = _gallery_index(gallery)
+
+    _gallery_cache = gallery
+    _gallery_version = version
+    _last_full_reload = monotonic()
+    _unreadable = unreadable
+    _save_snapshot(gallery)
+    return _gallery_cache
+
+
+def _apply_row(gallery, sid, blob, enrolled):
+    directory.invalidate(sid)
+    embedding = _decrypt_embedding(sid, blob) if enrolled else None
+    if embedding is not None:
+        gallery.upsert(sid, embedding)
+        _unreadable.discard(sid)
+    else:
+        gallery.remove(sid)
+        if enrolled:
+            _unreadable.add(sid)
+        else:
+            _unreadable.discard(sid)
+
+
+def refresh_gallery(progress=None):
+    global _gallery_version, _unreadable
+    rows = fetch_rows("""
+        SELECT student_no, facial_recognition_data, has_facial_recognition, updated_at
+        FROM students
+        WHERE updated_at > %s
+        ORDER BY updated_at
+    """, (_gallery_version - REFRESH_OVERLAP,))
+
+    gallery = _gallery_cache
+    for i, (sid, blob, enrolled, updated_at) in enumerate(rows):
+        if progress and i % PROGRESS_EVERY == 0:
+            progress(i, len(rows))
+        _apply_row(gallery, sid, blob, enrolled)
+        _gallery_version = newest(_gallery_version, updated_at)
+
+    enrolled = _enrolled_ids()
+    deleted = [sid for sid in gallery.ids if sid is not None and sid not in enrolled]
+    for sid in deleted:
+        directory.invalidate(sid)
+        gallery.remove(sid)
+    _unreadable &= enrolled
+
+    missed = [sid for sid in enrolled if sid not in gallery and sid not in _unreadable]
+    if missed:
+        for sid, blob, enrolled_flag in fetch_rows("""
+            SELECT student_no, facial_recognition_data, has_facial_recognition
+            FROM students
+            WHERE student_no = ANY(%s)
+        """, (missed,)):
+            _apply_row(gallery, sid, blob, enrolled_flag)
+    if progress:
+        progress(len(rows), len(rows))
+    return len(rows) + len(deleted) + len(missed)
+
+
+def load_gallery(force_reload=False, full=False, progress=None):
     if _gallery_cache is not None and not force_reload:
         return _gallery_cache
 
+    with _load_lock:
+        return _load_gallery_locked(full, progress)
+
+
+def _load_gallery_locked(full, progress):
+    full = (
+        full
+        or _gallery_cache is None
+        or not _delta_supported
+        or _gallery_version is None
+        or monotonic() - _last_full_reload > FULL_RELOAD_INTERVAL
+    )
+    if full:
+        return _full_reload(progress)
+
     try:
-        conn, _ = get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT student_no, facial_recognition_data
-            FROM students
-            WHERE has_facial_recognition = TRUE
-        """)
-        rows = cur.fetchall()
+        changed = refresh_gallery(progress)
+        if changed:
+            _save_snapshot(_gallery_cache)
     except Exception as e:
         print(f"[DB ERROR] {e}")
-        return {}
-    finally:
-        cur.close()
-        conn.close()
-
-    gallery = {}
-    for sid, blob in rows:
-        if not blob:
-            continue
-        if isinstance(blob, memoryview):
-            blob = blob.tobytes()
-        elif isinstance(blob, str):
-            try:
-                blob = bytes.fromhex(blob)
-            except ValueError:
-                import base64
-                try:
-                    blob = base64.b64decode(blob)
-                except Exception:
-                    blob = blob.encode("utf-8")
+    return _gallery_cache
 
-        try:
-            decrypted = fernet.decrypt(blob)
-            embedding = np.frombuffer(decrypted, dtype=np.float32)
-            if embedding.size > 0:
-                gallery[sid] = {"embedding": embedding}
-        except Exception as e:
-            print(f"[DECRYPT ERROR] {sid}: {e}")
 
-    _gallery_cache = gallery
-    return _gallery_cache
+def add_to_gallery(student_no, embedding):
+    if _gallery_cache is not None:
+        _gallery_cache.upsert(student_no, embedding)
 
 
-def reset_models():
-    global _det_model, _rec_model, _det_req, _gallery_cache
-    _gallery_cache = None
+def _gallery_index(gallery):
+    kind = index_kind(len(gallery.matrix), INDEX_KIND)
+    if kind == "exact":
+        return ExactIndex(gallery.matrix)
+
     try:
-        _det_model = _load_model(DET_MODEL)
-        _rec_model = _load_model(REC_MODEL)
-        _det_req = _det_model.create_infer_request() if _det_model else None
+        return load_index(INDEX_PATH, gallery.matrix, gallery.ids)
+    except Exception:
+        pass
+
+    index = build_index(gallery.matrix, kind)
+    try:
+        os.makedirs(os.path.dirname(INDEX_PATH), exist_ok=True)
+        save_index(index, INDEX_PATH, gallery.ids)
     except Exception as e:
-        print(f"[RESET MODELS ERROR] {e}")
+        print(f"[INDEX ERROR] {e}")
+    return index
 
 
-def preprocess(img, h, w, rgb=False):
-    resized = cv2.resize(img, (w, h), interpolation=cv2.INTER_AREA)
-    if rgb:
-        resized = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
-    blob = np.transpose(resized, (2, 0, 1))[None].astype(np.float32, copy=False)
-    return blob
+def best_face_box(detections, frame_shape):
+    h, w = frame_shape[:2]
+    faces = [det for det in detections[0][0] if det[2] > CONF_THRESHOLD]
+    if not faces:
+        return None
+
+    best = max(faces, key=lambda f: f[2] * ((f[5] - f[3]) * (f[6] - f[4])))
+    x1, y1, x2, y2 = int(best[3] * w), int(best[4] * h), int(best[5] * w), int(best[6] * h)
+    x1, y1 = max(0, x1), max(0, y1)
+    x2, y2 = min(w, x2), min(h, y2)
+    return x1, y1, x2, y2
+
+
+def normalize_embedding(out):
+    out = out.flatten()
+    return out / (np.linalg.norm(out) + 1e-9)
 
 
 def get_embedding(face_crop):
-    if not _rec_model:
+    rec_req = registry.infer_request("rec")
+    if rec_req is None:
         return None
-    blob = preprocess(face_crop, _rec_h, _rec_w)
-    out = _rec_model([blob])[_rec_model.output(0)].flatten()
-    return out / (np.linalg.norm(out) + 1e-9)
+    rec_req.infer([as_input(face_crop)])
+    return normalize_embedding(rec_req.get_output_tensor(0).data)
+
+
+def match_embedding(school_id, emb, gallery, mode=None):
+    if (mode or VERIFY_MODE) == "1:1":
+        claimed, impostor, _ = gallery.verify_claim(school_id, emb, IMPOSTOR_TOP_K)
+        if claimed is None:
+            return False, "Not Found"
+        if impostor is not None and impostor >= SIM_THRESHOLD and impostor > claimed:
+            return False, "Different ID"
+        if claimed >= SIM_THRESHOLD:
+            return True, school_id
+        return False, "Unrecognized"
+
+    sims, ids = gallery.search(emb, MATCH_TOP_K)
+    best_sim, best_id = float(sims[0]), ids[0]
+    ok = best_sim >= SIM_THRESHOLD
+
+    if ok and best_id == school_id:
+        return True, best_id
+    elif ok:
+        return False, "Different ID"
+    return False, "Unrecognized"
 
 
-def verify_face(school_id, frame, gallery, return_box=False):
+def verify_face(school_id, frame, gallery, return_box=False, mode=None):
     if school_id not in gallery:
         return False, "Not Found", None
+    det_req = registry.infer_request("det")
+    if det_req is None:
+        return False, "Model Unavailable", None
 
-    frame_proc = cv2.resize(frame, (PROCESS_WIDTH, PROCESS_HEIGHT))
-    blob = preprocess(frame_proc, _det_h, _det_w)
-    _det_req.infer({_det_model.input(0).any_name: blob})
-    detections = _det_req.get_output_tensor(0).data
-
-    h, w, _ = frame_proc.shape
-    faces = [
-        (
-            float(det[2]),
-            int(det[3] * w),
-            int(det[4] * h),
-            int(det[5] * w),
-            int(det[6] * h)
-        )
-        for det in detections[0][0] if det[2] > CONF_THRESHOLD
-    ]
-
-    if not faces:
+    det_req.infer([as_input(frame)])
+    box = best_face_box(det_req.get_output_tensor(0).data, frame.shape)
+    if box is None:
         return False, "No Face Detected", None
 
-    _, xmin, ymin, xmax, ymax = max(
-        faces,
-        key=lambda f: f[0] * ((f[3]-f[1]) * (f[4]-f[2]))
-    )
-
-    scale_x = frame.shape[1] / PROCESS_WIDTH
-    scale_y = frame.shape[0] / PROCESS_HEIGHT
-    x1, y1, x2, y2 = map(int, [xmin * scale_x, ymin * scale_y, xmax * scale_x, ymax * scale_y])
-    x1, y1 = max(0, x1), max(0, y1)
-    x2, y2 = min(frame.shape[1], x2), min(frame.shape[0], y2)
-
+    x1, y1, x2, y2 = box
     face_crop = frame[y1:y2, x1:x2]
     if face_crop.size == 0:
         return False, "Invalid Crop", (x1, y1, x2, y2)
@@ -165,13 +334,5 @@ def verify_face(school_id, frame, gallery, return_box=False):
     if emb is None:
         return False, "Embedding Failed", (x1, y1, x2, y2)
 
-    sims = [(1 - cosine(emb, g["embedding"]), sid) for sid, g in gallery.items()]
-    sims.sort(reverse=True, key=lambda x: x[0])
-    best_sim, best_id = sims[0]
-    ok = best_sim >= SIM_THRESHOLD
-
-    if ok and best_id == school_id:
-        return True, best_id, (x1, y1, x2, y2) if return_box else None
-    elif ok:
-        return False, "Different ID", (x1, y1, x2, y2) if return_box else None
-    return False, "Unrecognized", (x1, y1, x2, y2) if return_box else None
\ No newline at end of file
+    ok, msg = match_embedding(school_id, emb, gallery, mode)
+    return ok, msg, (x1, y1, x2, y2) if return_box else None
@@ -1,18 +1,80 @@
+import threading
 from PyQt6.QtCore import QThread, pyqtSignal
-from face_recognition import verify_face
+from face_pipeline import FacePipeline, PIPELINE_JOBS
 
 
-class FaceThread(QThread):
+class FaceWorker(QThread):
     result_ready = pyqtSignal(bool, str, tuple)
-    def __init__(self, school_id, frame, gallery, parent=None):
+    def __init__(self, ring, on_small_face=None, parent=None):
         super().__init__(parent)
-        self.school_id = school_id
-        self.frame = frame.copy()
-        self.gallery = gallery
+        self.ring = ring
+        self.on_small_face = on_small_face
+        self.pipeline = None
+        self._buffers = [None] * (PIPELINE_JOBS + 1)
+        self._next_buffer = 0
+        self._last_seq = -1
+        self._target = None
+        self._target_lock = threading.Lock()
+        self._has_target = threading.Event()
+        self._stop_thread = False
+        self.skipped = 0
+
+
+    def set_target(self, school_id, gallery):
+        with self._target_lock:
+            changed = self._target is None or self._target[0] != school_id
+            self._target = (school_id, gallery)
+        if changed and self.pipeline:
+            self.pipeline.retarget()
+        self._has_target.set()
+
+
+    def clear_target(self):
+        with self._target_lock:
+            changed = self._target is not None
+            self._target = None
+        if changed and self.pipeline:
+            self.pipeline.retarget()
+        self._has_target.clear()
 
 
     def run(self):
-        ok, msg, box = verify_face(self.school_id, self.frame, self.gallery, return_box=True)
-        if box is None:
-            box = (0, 0, 0, 0)
-        self.result_ready.emit(ok, msg, box)
+        try:
+            self.pipeline = FacePipeline(jobs=PIPELINE_JOBS, on_small_face=self.on_small_face)
+        except Exception as e:
+            print(f"[FACE WORKER ERROR] {e}")
+            return
+        self.pipeline.result_ready.connect(self.result_ready)
+
+        while not self._stop_thread:
+            if not self._has_target.wait(timeout=0.1):
+                continue
+            if not self.pipeline.wait_ready(timeout=0.1):
+                continue
+
+            latest = self.ring.read_latest(self._last_seq, out=self._buffers[self._next_buffer], timeout=0.1)
+            if latest is None:
+                continue
+            seq, _, frame = latest
+
+            with self._target_lock:
+                target = self._target
+            if target is None:
+                continue
+
+            self._buffers[self._next_buffer] = frame
+            self._next_buffer = (self._next_buffer + 1) % len(self._buffers)
+            if self._last_seq >= 0:
+                self.skipped += seq - self._last_seq - 1
+            self._last_seq = seq
+
+            school_id, gallery = target
+            self.pipeline.submit(school_id, frame, gallery)
+
+        self.pipeline.close()
+
+
+    def stop(self):
+        self._stop_thread = True
+        self._has_target.set()
+        self.wait()
@@ -16,9 +16,11 @@ class FingerEnrollWorker(QThread):
             from fingerprint_enrollment import capture_fingerprint, save_to_db
 
             reader = FingerprintReader()
-            template = capture_fingerprint(reader)
-            save_to_db(self.student_no, template)
-            reader.close()
+            try:
+                template = capture_fingerprint(reader)
+                save_to_db(self.student_no, template)
+            finally:
+                reader.close()
 
             self.finished.emit(True, "Success")
         except Exception as e:
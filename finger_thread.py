@@ -1,76 +1,171 @@
 from PyQt6.QtCore import QThread, pyqtSignal
 from fingerprint_reader import FingerprintReader
-from time import sleep
+from collections import deque
+from time import sleep, monotonic
 import threading
 
 
+RELEASE_TIMEOUT = 3.0
+FINGER_POLL_INTERVAL = 0.02
+FINGER_LIFT_INTERVAL = 0.05
+FINGER_LIFT_POLLS = 3
+FINGER_OPEN_SETTLE = 0.5
+FINGER_ERROR_BACKOFF = 1.0
+LATENCY_SAMPLES = 100
+
+WAITING = "waiting"
+PRESENT = "present"
+LIFTING = "lifting"
+
+
 class FingerprintThread(QThread):
     fingerprintDetected = pyqtSignal(str)
-    def __init__(self, parent=None):
+    def __init__(self, poll_interval=FINGER_POLL_INTERVAL, lift_interval=FINGER_LIFT_INTERVAL,
+                 lift_polls=FINGER_LIFT_POLLS, parent=None):
         super().__init__(parent)
         self.reader = None
+        self.poll_interval = poll_interval
+        self.lift_interval = lift_interval
+        self.lift_polls = lift_polls
+        self.state = WAITING
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._empty_polls = 0
         self._stop = False
         self._active = False
         self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._release = threading.Event()
+        self._released = threading.Event()
 
 
     def activate(self):
         with self._lock:
             if not self._active:
                 self._active = True
+        self._wake.set()
 
 
     def deactivate(self):
         with self._lock:
-            if self._active:
-                self._active = False
-                if self.reader:
-                    try:
-                        self.reader.close()
-                    except Exception:
-                        pass
-                    self.reader = None
+            self._active = False
+
+
+    def is_active(self):
+        with self._lock:
+            return self._active
+
+
+    def release_device(self, timeout=RELEASE_TIMEOUT):
+        self.deactivate()
+        if not self.isRunning():
+            self._close_reader()
+            return True
+        self._released.clear()
+        self._release.set()
+        self._wake.set()
+        return self._released.wait(timeout)
 
 
     def stop(self):
         self._stop = True
         self.deactivate()
+        self._wake.set()
+
+
+    def latency_stats(self):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return {
+            "count": len(ordered),
+            "mean_ms": sum(ordered) / len(ordered),
+            "p50_ms": ordered[len(ordered) // 2],
+            "max_ms": ordered[-1],
+        }
+
+
+    def _idle(self, timeout):
+        if self._wake.wait(timeout):
+            self._wake.clear()
+
+
+    def _close_reader(self):
+        if self.reader:
+            try:
+                self.reader.close()
+            except Exception:
+                pass
+            self.reader = None
+
+
+    def _open_reader(self):
+        try:
+            self.reader = FingerprintReader()
+        except Exception as e:
+            print(f"[FINGER] Device open failed: {e}")
+            return False
+        sleep(FINGER_OPEN_SETTLE)
+        return True
+
+
+    def _on_finger(self, template, touched):
+        self.state = PRESENT
+        started = monotonic()
+        result = self.reader.identify(template)
+        identify_ms = (monotonic() - started) * 1000
+
+        self.state = LIFTING
+        self._empty_polls = 0
+        if not self.is_active():
+            return
+
+        self.fingerprintDetected.emit(result or "")
+        latency = (monotonic() - touched) * 1000
+        self.latencies.append(latency)
+        print(f"[FINGER] Touch to emit {latency:.1f} ms (identify {identify_ms:.1f} ms)")
+
+
+    def _step(self):
+        touched = monotonic()
+        template = self.reader.poll_template()
+
+        if self.state == LIFTING:
+            self._empty_polls = 0 if template else self._empty_polls + 1
+            if self._empty_polls >= self.lift_polls:
+                self.state = WAITING
+                return
+            self._idle(self.lift_interval)
+            return
+
+        if template:
+            self._on_finger(template, touched)
+        else:
+            self.reader.idle_sync()
+            self._idle(self.poll_interval)
 
 
     def run(self):
         while not self._stop:
-            with self._lock:
-                active = self._active
+            if self._release.is_set():
+                self._release.clear()
+                self._close_reader()
+                self._released.set()
 
-            if not active:
-                sleep(0.5)
+            if not self.is_active():
+                self.state = WAITING
+                self._idle(0.5)
                 continue
 
-            if not self.reader:
-                try:
-                    self.reader = FingerprintReader()
-                    sleep(0.5) 
-                except Exception as e:
-                    sleep(1)
-                    continue
+            if not self.reader and not self._open_reader():
+                self._idle(FINGER_ERROR_BACKOFF)
+                continue
 
             try:
-                template = self.reader.capture_template()
-                if template:
-                    result = self.reader.identify(template)
-                    if result:
-                        self.fingerprintDetected.emit(result)
-                    else:
-                        self.fingerprintDetected.emit("")
-                else:
-                    sleep(0.2)
+                self._step()
             except Exception as e:
-                if self.reader: 
-                    try:
-                        self.reader.close()
-                    except Exception:
-                        pass
-                    self.reader = None
-                sleep(1)
+                print(f"[FINGER] Device error: {e}")
+                self._close_reader()
+                self.state = WAITING
+                self._idle(FINGER_ERROR_BACKOFF)
 
-        self.deactivate()
+        self._close_reader()
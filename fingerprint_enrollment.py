@@ -4,7 +4,8 @@ from fingerprint_reader import FingerprintReader
 from time import sleep
 from cryptography.fernet import Fernet
 from dotenv import load_dotenv
-from db_utils import get_connection
+from db_utils import db_connection
+from fingerprint_gallery import fingerprint_gallery
 
 load_dotenv()
 MAX_CAPTURE_ATTEMPTS = 5
@@ -17,21 +18,19 @@ def encrypt_template(template: bytes) -> bytes:
 
 
 def save_to_db(student_no: str, template: bytes):
-    conn, _ = get_connection()
-    cur = conn.cursor()
-
     encrypted_template = encrypt_template(template)
 
-    cur.execute("""
-        INSERT INTO fingerprints (student_no, template)
-        VALUES (%s, %s)
-        ON CONFLICT (student_no)
-        DO UPDATE SET template = EXCLUDED.template
-    """, (student_no, Binary(encrypted_template)))
-
-    conn.commit()
-    cur.close()
-    conn.close()
+    with db_connection() as (conn, _):
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO fingerprints (student_no, template)
+                VALUES (%s, %s)
+                ON CONFLICT (student_no)
+                DO UPDATE SET template = EXCLUDED.template
+            """, (student_no, Binary(encrypted_template)))
+        conn.commit()
+
+    fingerprint_gallery.upsert(student_no, template)
 
 
 def capture_fingerprint(reader: FingerprintReader) -> bytes:
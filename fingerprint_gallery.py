@@ -0,0 +1,145 @@
+import os
+import threading
+import psycopg2
+from time import monotonic, sleep
+from dotenv import load_dotenv
+from db_utils import fetch_rows, newest, REFRESH_OVERLAP
+from bulk_decrypt import decrypt_rows, to_bytes
+
+
+load_dotenv()
+FERNET_KEY = os.getenv("CRYPT_FERNET_KEY")
+
+FINGER_REFRESH_INTERVAL = 60
+FINGER_FULL_RELOAD_INTERVAL = 6 * 60 * 60
+
+
+class FingerprintGallery:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._templates = {}
+        self._unreadable = set()
+        self.entries = ()
+        self._version = None
+        self._delta_supported = True
+        self._last_full_reload = 0.0
+        self._loaded = threading.Event()
+        self._thread = None
+
+
+    def __len__(self):
+        return len(self.entries)
+
+
+    def _publish(self):
+        self.entries = tuple(self._templates.items())
+
+
+    def load(self):
+        try:
+            try:
+                rows = fetch_rows("SELECT student_no, template, updated_at FROM fingerprints")
+            except psycopg2.errors.UndefinedColumn:
+                self._delta_supported = False
+                rows = [(sid, blob, None) for sid, blob in fetch_rows("SELECT student_no, template FROM fingerprints")]
+        except Exception as e:
+            print(f"[FINGER DB ERROR] {e}")
+            return False
+
+        plain = decrypt_rows(FERNET_KEY, [to_bytes(blob) for _, blob, _ in rows])
+        templates, unreadable, version = {}, set(), None
+        for (sid, _, updated_at), template in zip(rows, plain):
+            version = newest(version, updated_at)
+            if template is None:
+                print(f"Error Decrypt {sid}")
+                unreadable.add(sid)
+                continue
+            templates[sid] = template
+
+        with self._lock:
+            self._templates = templates
+            self._unreadable = unreadable
+            self._version = version
+            self._last_full_reload = monotonic()
+            self._publish()
+        self._loaded.set()
+        print(f"[FINGER] {len(templates)} templates loaded")
+        return True
+
+
+    def refresh(self):
+        if (
+            not self._loaded.is_set()
+            or not self._delta_supported
+            or self._version is None
+            or monotonic() - self._last_full_reload > FINGER_FULL_RELOAD_INTERVAL
+        ):
+            return self.load()
+
+        try:
+            rows = fetch_rows("""
+                SELECT student_no, template, updated_at
+                FROM fingerprints
+                WHERE updated_at > %s
+                ORDER BY updated_at
+            """, (self._version - REFRESH_OVERLAP,))
+            ids = {sid for (sid,) in fetch_rows("SELECT student_no FROM fingerprints")}
+        except Exception as e:
+            print(f"[FINGER DB ERROR] {e}")
+            return False
+
+        plain = decrypt_rows(FERNET_KEY, [to_bytes(blob) for _, blob, _ in rows])
+        with self._lock:
+            for (sid, _, updated_at), template in zip(rows, plain):
+                if template is None:
+                    print(f"Error Decrypt {sid}")
+                    self._templates.pop(sid, None)
+                    self._unreadable.add(sid)
+                else:
+                    self._templates[sid] = template
+                    self._unreadable.discard(sid)
+                self._version = newest(self._version, updated_at)
+            deleted = [sid for sid in self._templates if sid not in ids]
+            for sid in deleted:
+                del self._templates[sid]
+            self._unreadable &= ids
+            missed = any(sid not in self._templates and sid not in self._unreadable for sid in ids)
+            if rows or deleted:
+                self._publish()
+
+        return self.load() if missed else True
+
+
+    def upsert(self, student_no, template):
+        with self._lock:
+            self._templates[student_no] = bytes(template)
+            self._publish()
+
+
+    def remove(self, student_no):
+        with self._lock:
+            if self._templates.pop(student_no, None) is not None:
+                self._publish()
+
+
+    def ensure_loaded(self, timeout=None):
+        if self._loaded.is_set():
+            return True
+        self.start()
+        return self._loaded.wait(timeout)
+
+
+    def _run(self, interval):
+        while True:
+            self.refresh()
+            sleep(interval)
+
+
+    def start(self, interval=FINGER_REFRESH_INTERVAL):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, args=(interval,), name="FingerprintGallery", daemon=True)
+                self._thread.start()
+
+
+fingerprint_gallery = FingerprintGallery()
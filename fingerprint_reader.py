@@ -1,13 +1,27 @@
 import os
-from time import sleep
+import threading
+from time import sleep, perf_counter, monotonic
+from concurrent.futures import ThreadPoolExecutor
 from pyzkfp import ZKFP2
-from cryptography.fernet import Fernet
-from dotenv import load_dotenv
-from db_utils import get_connection
+from fingerprint_gallery import fingerprint_gallery
 
-load_dotenv()
-FERNET_KEY = os.getenv("CRYPT_FERNET_KEY")
-cipher = Fernet(FERNET_KEY)
+FINGER_LOAD_TIMEOUT = 5
+CAPTURE_RETRY_INTERVAL = 0.5
+MATCH_WORKERS = max(1, min(4, os.cpu_count() or 1))
+MATCH_SHARD_MIN = 64
+STRONG_MATCH_SCORE = 95
+NATIVE_RETRY_INTERVAL = 30
+
+_match_pool = None
+_match_pool_lock = threading.Lock()
+
+
+def _get_match_pool():
+    global _match_pool
+    with _match_pool_lock:
+        if _match_pool is None:
+            _match_pool = ThreadPoolExecutor(MATCH_WORKERS, thread_name_prefix="DBMatch")
+        return _match_pool
 
 
 class FingerprintReader:
@@ -19,60 +33,202 @@ class FingerprintReader:
             raise RuntimeError("Device Missing")
 
         self.dev_handle = self.zk.OpenDevice()
+        self.native = True
+        self._match_contexts = []
+        self._fids = {}
+        self._students = {}
+        self._next_fid = 1
+        self._synced = None
+        self._native_retry = 0.0
+        self.idle_sync()
+
+    def poll_template(self):
+        result = self.zk.AcquireFingerprint()
+        if result:
+            template, img = result
+            return bytes(template)
+        return None
 
-    def capture_template(self, max_attempts=5):
+    def capture_template(self, max_attempts=5, interval=CAPTURE_RETRY_INTERVAL):
         for attempt in range(max_attempts):
             try:
-                result = self.zk.AcquireFingerprint()
-                if result:
-                    template, img = result
-                    return bytes(template)
+                template = self.poll_template()
+                if template:
+                    return template
             except Exception:
                 pass
-            sleep(0.5)
+            sleep(interval)
         return None
 
-    def identify(self, template_bytes, threshold: int = 80):
-        if not template_bytes:
-            return None
-
-        conn, _ = get_connection()
-        if not conn:
-            return None
+    def sync_cache(self):
+        entries = fingerprint_gallery.entries
+        if entries is self._synced:
+            return
+
+        current = dict(entries)
+        for student_no in [sid for sid in self._fids if sid not in current]:
+            fid, _ = self._fids.pop(student_no)
+            del self._students[fid]
+            self.zk.DBDel(fid)
+
+        for student_no, template in entries:
+            known = self._fids.get(student_no)
+            if known and known[1] == template:
+                continue
+            if known:
+                fid = known[0]
+                self.zk.DBDel(fid)
+            else:
+                fid = self._next_fid
+                self._next_fid += 1
+            try:
+                self.zk.DBAdd(fid, template)
+            except Exception as e:
+                print(f"Error Cache {student_no}: {e}")
+                self._fids.pop(student_no, None)
+                self._students.pop(fid, None)
+                continue
+            self._fids[student_no] = (fid, template)
+            self._students[fid] = student_no
+
+        self._synced = entries
+
+    def _reset_cache(self):
+        self.zk.DBClear()
+        self._fids = {}
+        self._students = {}
+        self._synced = None
+
+    def idle_sync(self):
+        if self.native:
+            if fingerprint_gallery.entries is self._synced:
+                return
+        elif monotonic() < self._native_retry:
+            return
 
-        cur = conn.cursor()
         try:
-            cur.execute("SELECT student_no, template FROM fingerprints")
-            records = cur.fetchall()
+            if not self.native:
+                self._reset_cache()
+            self.sync_cache()
         except Exception as e:
-            cur.close()
-            conn.close()
-            return None
-
-        cur.close()
-        conn.close()
-
-        if not records:
-            return None
+            print(f"[FINGER] Native cache unavailable, using DBMatch: {e}")
+            self.native = False
+            self._native_retry = monotonic() + NATIVE_RETRY_INTERVAL
+            return
+
+        if not self.native:
+            print("[FINGER] Native cache restored")
+        self.native = True
+
+    def _identify_native(self, template_bytes, threshold):
+        self.sync_cache()
+        fid, score = self.zk.DBIdentify(template_bytes)
+        if fid and score >= threshold:
+            return self._students.get(fid)
+        return None
 
-        for student_no, encrypted_template in records:
+    def _get_match_contexts(self, workers):
+        while len(self._match_contexts) < workers:
+            context = ZKFP2()
+            context.DBInit()
+            self._match_contexts.append(context)
+        return self._match_contexts[:workers]
+
+    def _match_shard(self, context, template_bytes, shard, strong, found):
+        best_score, best_id = -1, None
+        for student_no, template in shard:
+            if found.is_set():
+                break
             try:
-                if isinstance(encrypted_template, memoryview):
-                    encrypted_template = encrypted_template.tobytes()
+                score = context.DBMatch(template_bytes, template)
+            except Exception as e:
+                print(f"Error {e}")
+                continue
+
+            if score > best_score:
+                best_score, best_id = score, student_no
+            if score >= strong:
+                found.set()
+                break
+
+        return best_score, best_id
+
+    def _identify_loop(self, template_bytes, threshold, workers=MATCH_WORKERS):
+        entries = fingerprint_gallery.entries
+        strong = max(threshold, STRONG_MATCH_SCORE)
+        found = threading.Event()
+
+        if workers <= 1 or len(entries) < MATCH_SHARD_MIN:
+            results = [self._match_shard(self.zk, template_bytes, entries, strong, found)]
+        else:
+            contexts = self._get_match_contexts(workers)
+            shards = [entries[i::workers] for i in range(workers)]
+            results = list(_get_match_pool().map(
+                lambda job: self._match_shard(job[0], template_bytes, job[1], strong, found),
+                zip(contexts, shards)
+            ))
+
+        best_score, best_id = max(results, key=lambda result: result[0])
+        return best_id if best_score >= threshold else None
 
-                decrypted_template = cipher.decrypt(encrypted_template)
-                score = self.zk.DBMatch(template_bytes, decrypted_template)
+    def identify(self, template_bytes, threshold: int = 80):
+        if not template_bytes:
+            return None
 
-                if score >= threshold:
-                    return student_no
+        if not fingerprint_gallery.ensure_loaded(timeout=FINGER_LOAD_TIMEOUT):
+            return None
 
+        if self.native:
+            try:
+                return self._identify_native(template_bytes, threshold)
             except Exception as e:
-                print(f"Error {e}")
+                print(f"[FINGER] Native identify failed, using DBMatch: {e}")
+                self.native = False
+                self._native_retry = monotonic() + NATIVE_RETRY_INTERVAL
 
-        return None
+        return self._identify_loop(template_bytes, threshold)
 
     def close(self):
+        for context in self._match_contexts:
+            try:
+                context.DBFree()
+            except Exception:
+                pass
+        self._match_contexts = []
         if self.dev_handle:
             self.zk.CloseDevice()
             self.dev_handle = None
         self.zk.Terminate()
+
+
+def benchmark(runs=20, threshold=80):
+    reader = FingerprintReader()
+    try:
+        fingerprint_gallery.load()
+        print("Place a finger on the reader")
+        template = reader.capture_template(max_attempts=20)
+        if not template:
+            print("No fingerprint captured")
+            return
+
+        start = perf_counter()
+        reader.sync_cache()
+        print(f"cache load  {len(fingerprint_gallery)} templates  {(perf_counter() - start) * 1000:8.1f} ms")
+
+        paths = (
+            ("native", reader._identify_native),
+            ("python", lambda t, th: reader._identify_loop(t, th, workers=1)),
+            (f"python x{MATCH_WORKERS}", reader._identify_loop),
+        )
+        for name, identify in paths:
+            start = perf_counter()
+            for _ in range(runs):
+                result = identify(template, threshold)
+            elapsed = (perf_counter() - start) / runs * 1000
+            print(f"{name:<11} {len(fingerprint_gallery)} templates  {elapsed:8.2f} ms/identify  -> {result}")
+    finally:
+        reader.close()
+
+
+if __name__ == "__main__":
+    benchmark()
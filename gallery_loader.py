@@ -0,0 +1,31 @@
+from time import perf_counter
+from PyQt6.QtCore import QThread, pyqtSignal
+from face_recognition import load_gallery, load_gallery_snapshot
+
+
+class GalleryLoader(QThread):
+    progress = pyqtSignal(int, int)
+    loaded = pyqtSignal(object, float)
+    def __init__(self, force_reload=False, full=False, parent=None):
+        super().__init__(parent)
+        self.force_reload = force_reload
+        self.full = full
+        self.elapsed = None
+
+
+    def run(self):
+        start = perf_counter()
+        force_reload = self.force_reload
+        if not force_reload:
+            snapshot = load_gallery_snapshot()
+            if snapshot is not None:
+                self.loaded.emit(snapshot, perf_counter() - start)
+                force_reload = True
+
+        gallery = load_gallery(
+            force_reload=force_reload,
+            full=self.full,
+            progress=self.progress.emit
+        )
+        self.elapsed = perf_counter() - start
+        self.loaded.emit(gallery, self.elapsed)
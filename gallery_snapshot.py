@@ -0,0 +1,52 @@
+import os
+import json
+import struct
+import numpy as np
+from datetime import datetime
+from cryptography.fernet import Fernet
+
+
+SNAPSHOT_FORMAT = 1
+HEADER = struct.Struct("<I")
+ALIGN = 64
+
+
+def _pad(size):
+    return (ALIGN - size % ALIGN) % ALIGN
+
+
+def save_snapshot(path, key, ids, matrix, version):
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    header = json.dumps({
+        "format": SNAPSHOT_FORMAT,
+        "version": version.isoformat() if version is not None else None,
+        "rows": int(matrix.shape[0]),
+        "dim": int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+        "ids": [str(sid) for sid in ids],
+    }).encode("utf-8")
+    prefix = HEADER.size + len(header)
+    payload = b"".join((HEADER.pack(len(header)), header, b"\0" * _pad(prefix), matrix.tobytes()))
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(Fernet(key).encrypt(payload))
+    os.replace(tmp, path)
+
+
+def load_snapshot(path, key):
+    with open(path, "rb") as f:
+        payload = Fernet(key).decrypt(f.read())
+
+    (length,) = HEADER.unpack_from(payload)
+    header = json.loads(payload[HEADER.size:HEADER.size + length])
+    if header.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError("Unsupported snapshot format")
+
+    offset = HEADER.size + length
+    offset += _pad(offset)
+    rows, dim = header["rows"], header["dim"]
+    matrix = np.frombuffer(payload, dtype=np.float32, count=rows * dim, offset=offset).reshape(rows, dim)
+    ids = np.array(header["ids"], dtype=object)
+    version = datetime.fromisoformat(header["version"]) if header["version"] else None
+    return ids, matrix, version
@@ -4,11 +4,16 @@ from PyQt6.QtCore import Qt, QTimer, QDateTime
 from PyQt6.QtGui import QPixmap
 
 from main_ui import Ui_Citadel
-from face_recognition import load_gallery
+from face_gallery import FaceGallery
+from gallery_loader import GalleryLoader
 from utils import lookup_student, log_attendance
 from async_email_notifier import notify_parent_task
 from async_sms_notifier import notify_parent_sms_task
 from sync_worker import start_sync_worker
+from db_utils import monitor, internet
+from student_directory import directory
+from face_models import registry
+from fingerprint_gallery import fingerprint_gallery
 from finger_thread import FingerprintThread
 from camera_handler import CameraHandler
 from verification_handler import VerificationHandler
@@ -31,6 +36,11 @@ class MainWindow(QMainWindow, Ui_Citadel):
         self.current_qr = None
         self._suppress_feed = False
         self.last_logged = {}
+        monitor.start()
+        internet.start()
+        directory.start_warmup()
+        registry.start_warmup()
+        fingerprint_gallery.start()
         start_sync_worker(interval=10)
         self.footer_marquee = FooterMarquee(self.footerLabel, speed=35, padding=40, left_to_right=True)
 
@@ -77,7 +87,10 @@ class MainWindow(QMainWindow, Ui_Citadel):
         )
 
         # Load face gallery
-        self.gallery = load_gallery()
+        self.gallery = FaceGallery()
+        self.gallery_loader = None
+        self._pending_gallery_load = None
+        self.start_gallery_load()
 
         # Background Image
         self.overlay_image = QLabel(self)
@@ -106,9 +119,7 @@ class MainWindow(QMainWindow, Ui_Citadel):
                 self.fingerprint_thread.activate()
 
             try:
-                from face_recognition import reset_models, load_gallery
-                reset_models()
-                self.gallery = load_gallery(force_reload=True)
+                self.start_gallery_load(force_reload=True)
 
                 self.camera_handler.stop_camera()
                 self.camera_handler._display_bgr = None
@@ -126,8 +137,38 @@ class MainWindow(QMainWindow, Ui_Citadel):
             self.stackedWidget.setCurrentWidget(self.pages.get(page_name, self.page_main))
 
 
+    def start_gallery_load(self, force_reload=False, full=False):
+        if self.gallery_loader and self.gallery_loader.isRunning():
+            pending_force, pending_full = self._pending_gallery_load or (False, False)
+            self._pending_gallery_load = (pending_force or force_reload, pending_full or full)
+            return
+        self.gallery_loader = GalleryLoader(force_reload=force_reload, full=full)
+        self.gallery_loader.loaded.connect(self.on_gallery_loaded)
+        self.gallery_loader.progress.connect(self.on_gallery_progress)
+        self.gallery_loader.finished.connect(self.on_gallery_loader_finished)
+        self.gallery_loader.start()
+
+
+    def on_gallery_loader_finished(self):
+        if self._pending_gallery_load:
+            force_reload, full = self._pending_gallery_load
+            self._pending_gallery_load = None
+            self.start_gallery_load(force_reload=force_reload, full=full)
+
+
+    def on_gallery_progress(self, done, total):
+        if self.verification_active or self.current_qr:
+            return
+        self.statusLabel.setText("Ready" if done >= total else f"Loading faces {done}/{total}")
+
+
+    def on_gallery_loaded(self, gallery, elapsed):
+        self.gallery = gallery
+        print(f"[GALLERY] {len(gallery)} faces loaded in {elapsed:.2f}s")
+
+
     def on_face_result(self, ok, info, box):
-        if self._suppress_feed or not self.verification_active:
+        if self._suppress_feed or not self.verification_active or not self.current_qr:
             return
         if ok:
             self.face_timeout_timer.stop()
@@ -226,9 +267,11 @@ class MainWindow(QMainWindow, Ui_Citadel):
 
 
     def closeEvent(self, event):
-        if getattr(self, 'face_thread', None) and self.face_thread.isRunning():
-            self.face_thread.quit()
-            self.face_thread.wait(2000)
+        self._pending_gallery_load = None
+        if getattr(self, 'gallery_loader', None) and self.gallery_loader.isRunning():
+            self.gallery_loader.wait(2000)
+        if self.camera_handler.face_worker:
+            self.camera_handler.face_worker.stop()
         if getattr(self, 'camera_thread', None) and self.camera_thread.isRunning():
             self.camera_thread.stop()
             self.camera_thread.wait(2000)
@@ -1,5 +1,5 @@
 import psycopg2, msvcrt
-from db_utils import get_connection
+from student_directory import directory
 
 
 def read_qr_code():
@@ -14,17 +14,9 @@ def read_qr_code():
 
 def verify_qr_in_db(qr_value):
     try:
-        conn, _ = get_connection()
-        cur = conn.cursor()
+        exists = directory.get(qr_value) is not None
 
-        cur.execute("SELECT 1 FROM students WHERE student_no = %s", (qr_value,))
-        result = cur.fetchone()
-        cur.close()
-        conn.close()
-
-        exists = result is not None
-
-        return exists, _
+        return exists, "directory"
 
     except psycopg2.Error as e:
         return False, "error"
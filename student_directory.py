@@ -0,0 +1,116 @@
+import threading
+from time import monotonic
+from collections import OrderedDict
+from db_utils import db_connection
+
+
+STUDENT_CACHE_TTL = 15 * 60
+STUDENT_CACHE_SIZE = 5000
+
+STUDENT_QUERY = """
+    SELECT s.student_no,
+           s.fullname,
+           p.program_name AS program,
+           y.year_level,
+           y.section,
+           s.guardian_email,
+           s.guardian_contact
+    FROM students s
+    LEFT JOIN programs p ON s.program_id = p.id
+    LEFT JOIN year_sections y ON s.year_section_id = y.id
+"""
+
+
+def _to_record(row):
+    _, name, program, year, section, email, contact = row
+    return {
+        "fullname": name,
+        "program": program,
+        "year_section": f"{year}-{section}" if year and section else "",
+        "guardian_email": email,
+        "guardian_contact": contact,
+    }
+
+
+class StudentDirectory:
+    def __init__(self, ttl=STUDENT_CACHE_TTL, max_size=STUDENT_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+
+    def _store(self, student_no, record, now):
+        self._entries[student_no] = (now + self.ttl, record)
+        self._entries.move_to_end(student_no)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+    def _cached(self, student_no):
+        with self._lock:
+            entry = self._entries.get(student_no)
+            if entry is None:
+                return None
+            expires, record = entry
+            if monotonic() > expires:
+                del self._entries[student_no]
+                return None
+            self._entries.move_to_end(student_no)
+            return record
+
+
+    def get(self, student_no):
+        record = self._cached(student_no)
+        if record is not None:
+            self.hits += 1
+            return record
+
+        self.misses += 1
+        with db_connection() as (conn, _):
+            with conn.cursor() as cur:
+                cur.execute(STUDENT_QUERY + " WHERE s.student_no = %s", (student_no,))
+                row = cur.fetchone()
+
+        if not row:
+            return None
+
+        record = _to_record(row)
+        with self._lock:
+            self._store(student_no, record, monotonic())
+        return record
+
+
+    def warm(self):
+        try:
+            with db_connection() as (conn, _):
+                with conn.cursor() as cur:
+                    cur.execute(STUDENT_QUERY + " LIMIT %s", (self.max_size,))
+                    rows = cur.fetchall()
+        except Exception as e:
+            print(f"[DIRECTORY ERROR] {e}")
+            return 0
+
+        now = monotonic()
+        with self._lock:
+            for row in rows:
+                self._store(row[0], _to_record(row), now)
+        print(f"[DIRECTORY] {len(rows)} students cached")
+        return len(rows)
+
+
+    def start_warmup(self):
+        threading.Thread(target=self.warm, name="StudentDirectoryWarmup", daemon=True).start()
+
+
+    def invalidate(self, student_no=None):
+        with self._lock:
+            if student_no is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(student_no, None)
+
+
+directory = StudentDirectory()
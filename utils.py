@@ -1,97 +1,35 @@
-import json
 from datetime import datetime
-from db_utils import get_connection
+from db_utils import db_connection
+from sync_worker import request_sync
+from student_directory import directory
+
+
+ATTENDANCE_DB = "local"
+
 
 def lookup_student(student_no):
-    conn, source = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT s.fullname,
-               p.program_name AS program,
-               y.year_level,
-               y.section
-        FROM students s
-        LEFT JOIN programs p ON s.program_id = p.id
-        LEFT JOIN year_sections y ON s.year_section_id = y.id
-        WHERE s.student_no = %s
-    """, (student_no,))
-    row = cur.fetchone()
-    cur.close()
-    conn.close()
-
-    if not row:
+    record = directory.get(student_no)
+    if not record:
         return None
-
-    name, program, year, section = row
-    year_section = f"{year}-{section}" if year and section else ""
-    return name, program, year_section
+    return record["fullname"], record["program"], record["year_section"]
 
 
 def log_attendance(student_no, last_logged=None, set_status=None, method_id=None):
     try:
         now = datetime.now()
 
-        conn, _ = get_connection()
-        cur = conn.cursor()
-
-        cur.execute("SET TIME ZONE 'Asia/Manila'")
+        with db_connection(ATTENDANCE_DB) as (conn, _):
+            with conn.cursor() as cur:
+                cur.execute("SELECT log_id, operation FROM log_attendance_event(%s, %s)", (student_no, method_id))
+                event = cur.fetchone()
+            conn.commit()
 
-        student = lookup_student(student_no)
-        if not student:
+        if not event:
             if set_status:
                 set_status("Access Denied", "#FF6666")
-            cur.close()
-            conn.close()
             return False
 
-        cur.execute("""
-            SELECT id, time_in, time_out
-            FROM attendance_logs
-            WHERE student_no = %s
-            ORDER BY time_in DESC
-            LIMIT 1
-        """, (student_no,))
-        latest = cur.fetchone()
-
-        record_data = {
-            "student_no": student_no,
-            "time_in": None,
-            "time_out": None,
-            "method_id": method_id,
-        }
-
-        if latest:
-            log_id, time_in, time_out = latest
-            if time_in and not time_out:
-                cur.execute("UPDATE attendance_logs SET time_out = %s WHERE id = %s", (now, log_id))
-                record_data["time_out"] = now.isoformat()
-                operation = "update"
-            else:
-                cur.execute("""
-                    INSERT INTO attendance_logs (student_no, time_in, method_id)
-                    VALUES (%s, %s, %s)
-                    RETURNING id
-                """, (student_no, now, method_id))
-                log_id = cur.fetchone()[0]
-                record_data["time_in"] = now.isoformat()
-                operation = "insert"
-        else:
-            cur.execute("""
-                INSERT INTO attendance_logs (student_no, time_in, method_id)
-                VALUES (%s, %s, %s)
-                RETURNING id
-            """, (student_no, now, method_id))
-            log_id = cur.fetchone()[0]
-            record_data["time_in"] = now.isoformat()
-            operation = "insert"
-
-        conn.commit()
-
-        cur.execute("""
-            INSERT INTO sync_queue (table_name, record_id, operation, payload, synced)
-            VALUES ('attendance_logs', %s, %s, %s, 0)
-        """, (log_id, operation, json.dumps(record_data)))
-        conn.commit()
+        request_sync()
 
         if set_status:
             set_status("Attendance Recorded", "#77EE77")
@@ -99,12 +37,65 @@ def log_attendance(student_no, last_logged=None, set_status=None, method_id=None
         if last_logged is not None:
             last_logged[student_no] = now
 
-        cur.close()
-        conn.close()
         return True
 
     except Exception as e:
         if set_status:
             set_status("DB Error", "#FF6666")
         print("Attendance log error:", e)
-        return False
\ No newline at end of file
+        return False
+
+
+"""-- The entry/exit toggle reads the latest log from the database it runs on, and
+-- pg_advisory_xact_lock only serialises callers on that one Postgres instance.
+-- sync_worker pushes local -> cloud only, so kiosks that each keep their own
+-- LOCAL_DB never see each other's logs. Kiosks that share a gate must point
+-- LOCAL_DB_HOST at the same database for the toggle to hold across them.
+
+CREATE INDEX IF NOT EXISTS attendance_logs_student_time_in_idx
+    ON attendance_logs (student_no, time_in DESC);
+
+CREATE OR REPLACE FUNCTION log_attendance_event(p_student_no TEXT, p_method_id INTEGER)
+RETURNS TABLE (log_id INTEGER, operation TEXT) AS $$
+DECLARE
+    v_now TIMESTAMP := localtimestamp;
+    v_latest attendance_logs%ROWTYPE;
+    v_id INTEGER;
+    v_op TEXT;
+    v_payload JSONB;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM students WHERE student_no = p_student_no) THEN
+        RETURN;
+    END IF;
+
+    PERFORM pg_advisory_xact_lock(hashtext('attendance:' || p_student_no));
+
+    SELECT * INTO v_latest
+    FROM attendance_logs
+    WHERE student_no = p_student_no
+    ORDER BY time_in DESC
+    LIMIT 1;
+
+    IF FOUND AND v_latest.time_in IS NOT NULL AND v_latest.time_out IS NULL THEN
+        UPDATE attendance_logs SET time_out = v_now WHERE id = v_latest.id;
+        v_id := v_latest.id;
+        v_op := 'update';
+        v_payload := jsonb_build_object(
+            'student_no', p_student_no, 'time_in', v_latest.time_in,
+            'time_out', v_now, 'method_id', p_method_id);
+    ELSE
+        INSERT INTO attendance_logs (student_no, time_in, method_id)
+        VALUES (p_student_no, v_now, p_method_id)
+        RETURNING id INTO v_id;
+        v_op := 'insert';
+        v_payload := jsonb_build_object(
+            'student_no', p_student_no, 'time_in', v_now,
+            'time_out', NULL, 'method_id', p_method_id);
+    END IF;
+
+    INSERT INTO sync_queue (table_name, record_id, operation, payload, synced)
+    VALUES ('attendance_logs', v_id, v_op, v_payload, FALSE);
+
+    RETURN QUERY SELECT v_id, v_op;
+END;
+$$ LANGUAGE plpgsql SET TimeZone = 'Asia/Manila';"""